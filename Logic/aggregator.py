@@ -0,0 +1,243 @@
+import csv
+import datetime
+import time
+from collections import Counter, OrderedDict, deque
+
+# -------------------------------
+# Streaming Traffic Aggregator
+# -------------------------------
+
+# Rollup resolutions (seconds) and how many buckets of each are retained
+ROLLUP_RESOLUTIONS = {
+    "minute": 60,
+    "hour": 3600,
+    "day": 86400,
+}
+ROLLUP_RETENTION = {
+    "minute": 24 * 60,   # one day of minutes
+    "hour": 7 * 24,      # one week of hours
+    "day": 366,          # one year of days
+}
+
+DEFAULT_WINDOW_SECONDS = 60    # length of tumbling / sliding windows
+DEFAULT_SLIDE_SECONDS = 5      # step of the sliding window (bucket width)
+TRACK_TTL_SECONDS = 30         # forget a track id after this long without a sighting
+
+# Numeric fields of per-video summaries (Logic.yolo.process_video) that are not vehicle classes
+SUMMARY_FIELDS = {"total_vehicles", "frames", "fps", "duration"}
+
+
+def _bucket_start(ts, width):
+    return int(ts // width) * width
+
+
+def _to_seconds(ts):
+    """
+    Normalizes a timestamp (epoch seconds, datetime or 'YYYY-MM-DD HH:MM:SS') to epoch seconds.
+    """
+    if isinstance(ts, datetime.datetime):
+        return ts.timestamp()
+    if isinstance(ts, str):
+        return datetime.datetime.strptime(ts, "%Y-%m-%d %H:%M:%S").timestamp()
+    return float(ts)
+
+
+class TrafficAggregator:
+    """
+    Incrementally aggregates crossing events into windowed counts and rollups.
+
+    Every count is keyed by (camera, lane, class). Memory is bounded: the sliding window
+    keeps window_seconds / slide_seconds buckets and each rollup keeps a fixed number of
+    buckets (see ROLLUP_RETENTION), so the aggregator can run indefinitely on a live feed.
+    """
+
+    def __init__(self, window_seconds=DEFAULT_WINDOW_SECONDS, slide_seconds=DEFAULT_SLIDE_SECONDS,
+                 rollups=ROLLUP_RESOLUTIONS, retention=ROLLUP_RETENTION):
+        if window_seconds % slide_seconds != 0:
+            raise ValueError("window_seconds must be a multiple of slide_seconds")
+        self.window_seconds = window_seconds
+        self.slide_seconds = slide_seconds
+        self.rollups = dict(rollups)
+        self.retention = dict(retention)
+
+        # Sliding window: (bucket_start, Counter) for the last window_seconds
+        self._slide_buckets = deque(maxlen=window_seconds // slide_seconds)
+        # Tumbling window: the current window and the last completed one
+        self._tumble_start = None
+        self._tumble_current = Counter()
+        self._tumble_last = (None, Counter())
+        # Rollups: name -> OrderedDict(bucket_start -> Counter)
+        self._rollup_buckets = {name: OrderedDict() for name in self.rollups}
+        self._totals = Counter()
+        self._latest_ts = None
+
+        # Track de-duplication for detection logs: (camera, track_id) -> last seen ts
+        self._seen_tracks = OrderedDict()
+
+    # ---------------------------
+    # Ingestion
+    # ---------------------------
+    def add_event(self, ts, cls, lane=None, camera=None, count=1):
+        """
+        Records one crossing event (or `count` of them).
+        Args:
+            ts: Event time (epoch seconds, datetime or 'YYYY-MM-DD HH:MM:SS').
+            cls: Object class label, e.g. 'car' or 'motorcycle'.
+            lane: Lane id, or None when lanes are not configured.
+            camera: Camera / video identifier.
+            count: Number of events to add.
+        """
+        ts = _to_seconds(ts)
+        key = (camera, lane, cls)
+        if self._latest_ts is None or ts > self._latest_ts:
+            self._latest_ts = ts
+
+        self._totals[key] += count
+        self._add_sliding(ts, key, count)
+        self._add_tumbling(ts, key, count)
+        for name, width in self.rollups.items():
+            self._add_rollup(name, width, ts, key, count)
+
+    def add_detection(self, ts, track_id, cls, lane=None, camera=None):
+        """
+        Consumes one per-frame detection row; a track is counted on its first sighting only.
+        Track ids unseen for TRACK_TTL_SECONDS are forgotten, keeping memory bounded.
+        Returns:
+            bool: True if the row produced a new event.
+        """
+        ts = _to_seconds(ts)
+        track_key = (camera, track_id)
+        is_new = track_key not in self._seen_tracks
+        self._seen_tracks[track_key] = ts
+        self._seen_tracks.move_to_end(track_key)
+        while self._seen_tracks:
+            oldest_key, oldest_ts = next(iter(self._seen_tracks.items()))
+            if ts - oldest_ts <= TRACK_TTL_SECONDS:
+                break
+            self._seen_tracks.popitem(last=False)
+        if is_new:
+            self.add_event(ts, cls, lane=lane, camera=camera)
+        return is_new
+
+    def add_summary(self, summary, ts=None, lane=None, camera=None):
+        """
+        Adds a finished per-video summary ({class: count}); non-numeric values and the
+        SUMMARY_FIELDS (e.g. total_vehicles) are ignored. `ts` defaults to now.
+        """
+        if ts is None:
+            ts = time.time()
+        for cls, count in summary.items():
+            if cls in SUMMARY_FIELDS or isinstance(count, bool) or not isinstance(count, (int, float)):
+                continue
+            if count:
+                self.add_event(ts, cls, lane=lane, camera=camera, count=count)
+
+    def ingest_detection_log(self, csv_path, camera=None):
+        """
+        Streams a detection CSV written by detect_video (timestamp, frame_id, track_id, class, ...)
+        row by row, without loading it into memory.
+        """
+        with open(csv_path, newline="") as f:
+            for row in csv.DictReader(f):
+                if row.get("class", "unknown") == "unknown":
+                    continue
+                self.add_detection(row["timestamp"], int(row["track_id"]), row["class"],
+                                   lane=row.get("lane") or None, camera=camera)
+
+    def _add_sliding(self, ts, key, count):
+        start = _bucket_start(ts, self.slide_seconds)
+        if self._slide_buckets and start < self._slide_buckets[-1][0]:
+            # Late event: fold it into its bucket if that bucket is still retained
+            for bucket_start, bucket in self._slide_buckets:
+                if bucket_start == start:
+                    bucket[key] += count
+            return
+        if not self._slide_buckets or start > self._slide_buckets[-1][0]:
+            self._slide_buckets.append((start, Counter()))
+        self._slide_buckets[-1][1][key] += count
+
+    def _add_tumbling(self, ts, key, count):
+        start = _bucket_start(ts, self.window_seconds)
+        if self._tumble_start is None:
+            self._tumble_start = start
+        if start > self._tumble_start:
+            self._tumble_last = (self._tumble_start, self._tumble_current)
+            self._tumble_start = start
+            self._tumble_current = Counter()
+        elif start < self._tumble_start:
+            if start == self._tumble_last[0]:
+                self._tumble_last[1][key] += count
+            return
+        self._tumble_current[key] += count
+
+    def _add_rollup(self, name, width, ts, key, count):
+        buckets = self._rollup_buckets[name]
+        start = _bucket_start(ts, width)
+        if start not in buckets:
+            if buckets and start < next(iter(buckets)) and len(buckets) >= self.retention[name]:
+                return  # older than anything retained
+            out_of_order = bool(buckets) and start < next(reversed(buckets))
+            buckets[start] = Counter()
+            if out_of_order:
+                # Keep buckets ordered by time for out-of-order arrivals
+                for k in sorted(buckets):
+                    buckets.move_to_end(k)
+            while len(buckets) > self.retention[name]:
+                buckets.popitem(last=False)
+        buckets[start][key] += count
+
+    # ---------------------------
+    # Queries
+    # ---------------------------
+    def sliding_counts(self, now=None, group_by=("class",)):
+        """
+        Counts over the last window_seconds ending at `now` (defaults to the newest event).
+        """
+        now = self._latest_ts if now is None else _to_seconds(now)
+        total = Counter()
+        if now is None:
+            return {}
+        lower = now - self.window_seconds
+        for bucket_start, bucket in self._slide_buckets:
+            if lower < bucket_start + self.slide_seconds and bucket_start <= now:
+                total.update(bucket)
+        return _group(total, group_by)
+
+    def tumbling_counts(self, completed=False, group_by=("class",)):
+        """
+        Counts for the current tumbling window, or the last completed one.
+        Returns:
+            tuple: (window_start, {group: count})
+        """
+        if completed:
+            start, bucket = self._tumble_last
+        else:
+            start, bucket = self._tumble_start, self._tumble_current
+        return start, _group(bucket, group_by)
+
+    def rollup(self, resolution="minute", group_by=("class",)):
+        """
+        Returns:
+            list: [(bucket_start, {group: count}), ...] ordered by time.
+        """
+        return [(start, _group(bucket, group_by))
+                for start, bucket in self._rollup_buckets[resolution].items()]
+
+    def totals(self, group_by=("class",)):
+        return _group(self._totals, group_by)
+
+
+_GROUP_FIELDS = {"camera": 0, "lane": 1, "class": 2}
+
+
+def _group(counter, group_by):
+    """
+    Collapses (camera, lane, class) keys to the requested fields.
+    A single field yields plain keys, several fields yield tuples.
+    """
+    idx = [_GROUP_FIELDS[g] for g in group_by]
+    grouped = {}
+    for key, count in counter.items():
+        gkey = key[idx[0]] if len(idx) == 1 else tuple(key[i] for i in idx)
+        grouped[gkey] = grouped.get(gkey, 0) + count
+    return grouped
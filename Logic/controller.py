@@ -0,0 +1,230 @@
+from collections import deque
+import numpy as np
+from Logic.formula import DEFAULT_STRAIGHT_SAT_RATE, decide_green_lane
+from src.metrics import clock
+from src.zones import LaneCounter
+
+# -------------------------------
+# Closed-loop Signal Controller
+# -------------------------------
+
+STOP_SPEED = 20.0          # px/s (source pixels); slower than this inside a lane counts as queued
+SPEED_WINDOW = 1.0         # seconds of positions a track's speed is measured over (smooths box jitter)
+TRACK_GRACE = 1.5          # seconds a track stays queued after it was last seen in its lane
+REID_DISTANCE = 30.0       # px; a new track this close to a lost one in the same lane takes over its wait
+EMERGENCY_CLASSES = ()     # labels that trigger the emergency override, e.g. ("ambulance",)
+
+
+class _QueuedTrack:
+    __slots__ = ("lane", "wait", "stopped", "last_time", "positions", "is_emergency")
+
+    def __init__(self, lane, now, cx, cy, is_emergency):
+        self.lane = lane
+        self.wait = 0.0                    # seconds spent stopped in this lane
+        self.stopped = False               # queued: slower than stop_speed over the speed window
+        self.last_time = now               # last time seen inside its lane
+        self.positions = deque([(now, cx, cy)])
+        self.is_emergency = is_emergency
+
+
+class SignalController:
+    """
+    Feeds live tracks into decide_green_lane.
+
+    A lane's queue is the tracks in its polygon moving slower than stop_speed: `count` is their
+    number and `wait_time` the longest time any of them has spent stopped in the lane (the
+    head-of-queue wait, the same per-lane scale as hand-made decide_green_lane inputs). Both
+    are maintained incrementally: each tick only touches the tracks in the current frame plus
+    the ones recently lost, never the history. Detector misses make Sort hide a track for a few
+    frames, or give it a new id, so a track leaves its queue only after TRACK_GRACE seconds unseen
+    in its lane, and a new id that appears next to a lost track in the same lane inherits its
+    accumulated wait. Speed is measured over SPEED_WINDOW seconds so box jitter does not read as
+    movement.
+
+    The decision logic runs on every tick; a new green lane is applied once the current green
+    has run its duration, or immediately on an emergency.
+    """
+
+    def __init__(self, lanes, current_green_index=0, stop_speed=STOP_SPEED, speed_window=SPEED_WINDOW,
+                 grace=TRACK_GRACE, reid_distance=REID_DISTANCE, emergency_classes=EMERGENCY_CLASSES,
+                 metrics=None, silent=True):
+        self.zones = lanes if isinstance(lanes, LaneCounter) else LaneCounter(lanes)
+        n = len(self.zones.lanes)
+        self.lane_ids = self.zones.lane_ids
+        self.sat_rates = [lane.get("sat_rate", DEFAULT_STRAIGHT_SAT_RATE) for lane in self.zones.lanes]
+        self.stop_speed = stop_speed
+        self.speed_window = speed_window
+        self.grace = grace
+        self.reid_distance = reid_distance
+        self.emergency_classes = set(emergency_classes)
+        self.metrics = metrics
+        self.silent = silent
+
+        # Running per-lane aggregates
+        self.queue_counts = np.zeros(n, dtype=np.int64)     # stopped tracks per lane
+        self.lane_waits = np.zeros(n, dtype=np.float64)     # longest wait among them
+        self.emergency_counts = np.zeros(n, dtype=np.int64)
+        self.tracks = {}                   # track_id -> _QueuedTrack
+
+        self.current_green_index = current_green_index
+        self.green_until = None
+        self.last_decision = None
+
+    def _leave(self, state):
+        if state.stopped:
+            self.queue_counts[state.lane] -= 1
+        if state.is_emergency:
+            self.emergency_counts[state.lane] -= 1
+
+    def _enter(self, track_id, lane, now, cx, cy, is_emergency):
+        self.tracks[track_id] = _QueuedTrack(lane, now, cx, cy, is_emergency)
+        if is_emergency:
+            self.emergency_counts[lane] += 1
+
+    def _reidentify(self, track_id, lane, cx, cy, present):
+        """
+        Hand the nearest lost track in `lane` over to a new track id, if one is close enough.
+        """
+        best_id, best_dist = None, self.reid_distance
+        for lost_id, state in self.tracks.items():
+            if lost_id in present or state.lane != lane:
+                continue
+            _, lx, ly = state.positions[-1]
+            dist = ((cx - lx) ** 2 + (cy - ly) ** 2) ** 0.5
+            if dist <= best_dist:
+                best_id, best_dist = lost_id, dist
+        if best_id is None:
+            return None
+        state = self.tracks.pop(best_id)
+        self.tracks[track_id] = state
+        return state
+
+    def update(self, tracked_objects, labels=None, now=None, captured_at=None):
+        """
+        Update lane queues from this frame's tracks and run the signal decision.
+        Args:
+            tracked_objects: (N, 5) array of [x1, y1, x2, y2, track_id] in source coordinates.
+            labels: N class labels (None when unknown).
+            now: Scene time in seconds (video time for files, capture time for cameras).
+            captured_at: perf_counter() time the frame was captured, for frame-to-decision latency.
+        Returns:
+            dict: The decision (see decide()).
+        """
+        now = clock() if now is None else now
+        labels = labels if labels is not None else [None] * len(tracked_objects)
+        centers = (tracked_objects[:, 0:2] + tracked_objects[:, 2:4]) / 2
+        inside = self.zones.zone_membership(centers)
+        # First matching lane per track, -1 when outside every lane
+        lanes = np.where(inside.any(axis=1), inside.argmax(axis=1), -1)
+
+        # Tracks outside every lane are treated like missed frames until the grace runs out
+        present = {int(track[4]) for track, lane in zip(tracked_objects, lanes) if lane >= 0}
+        for n, track in enumerate(tracked_objects):
+            lane = int(lanes[n])
+            if lane < 0:
+                continue
+            track_id = int(track[4])
+            cx, cy = float(centers[n, 0]), float(centers[n, 1])
+            state = self.tracks.get(track_id)
+            if state is not None and state.lane != lane:
+                self._leave(self.tracks.pop(track_id))
+                state = None
+            if state is None:
+                state = self._reidentify(track_id, lane, cx, cy, present)
+                if state is None:
+                    self._enter(track_id, lane, now, cx, cy, labels[n] in self.emergency_classes)
+                    continue
+
+            # A track is queued while its speed over the window stays below stop_speed; its wait
+            # accrues for the time since it was last seen here (including frames it was hidden)
+            positions = state.positions
+            positions.append((now, cx, cy))
+            while len(positions) > 2 and positions[1][0] <= now - self.speed_window:
+                positions.popleft()
+            elapsed = now - state.last_time
+            t0, x0, y0 = positions[0]
+            if elapsed > 0 and now > t0:
+                speed = ((cx - x0) ** 2 + (cy - y0) ** 2) ** 0.5 / (now - t0)
+                stopped = speed < self.stop_speed
+                if stopped != state.stopped:
+                    self.queue_counts[lane] += 1 if stopped else -1
+                    state.stopped = stopped
+                if stopped:
+                    state.wait += elapsed
+            state.last_time = now
+
+        # Tracks unseen in their lane for longer than the grace period leave their queue
+        expired = [t for t, state in self.tracks.items()
+                   if t not in present and now - state.last_time > self.grace]
+        for track_id in expired:
+            self._leave(self.tracks.pop(track_id))
+
+        # Head-of-queue wait per lane, over the live (and briefly lost) tracks only
+        self.lane_waits[:] = 0.0
+        for state in self.tracks.values():
+            if state.stopped and state.wait > self.lane_waits[state.lane]:
+                self.lane_waits[state.lane] = state.wait
+
+        return self.decide(now, captured_at)
+
+    def lane_inputs(self):
+        """
+        Returns:
+            list: Lane dicts in the format decide_green_lane expects.
+        """
+        return [{"count": int(self.queue_counts[i]), "wait_time": float(self.lane_waits[i]),
+                 "sat_rate": self.sat_rates[i]} for i in range(len(self.lane_ids))]
+
+    def decide(self, now, captured_at=None):
+        """
+        Run decide_green_lane on the current queues and apply it when the green phase allows.
+        Returns:
+            dict: {"green_lane", "green_index", "duration", "switched", "emergency", "lanes", "latency_ms"}
+        """
+        lanes = self.lane_inputs()
+        emergency_flags = [bool(c) for c in self.emergency_counts]
+        chosen, duration = decide_green_lane(lanes, emergency_flags, self.current_green_index, silent=True)
+
+        emergency = any(emergency_flags)
+        phase_over = self.green_until is None or now >= self.green_until
+        switched = False
+        if chosen != self.current_green_index and (phase_over or emergency):
+            self.current_green_index = chosen
+            self.green_until = now + duration
+            switched = True
+            if not self.silent:
+                print(f"[Signal] t={now:.1f}s green -> lane {self.lane_ids[chosen]} for {duration}s"
+                      f"{' (emergency)' if emergency else ''}")
+        elif phase_over:
+            self.green_until = now + duration
+
+        decision = {
+            "green_lane": self.lane_ids[self.current_green_index],
+            "green_index": self.current_green_index,
+            "duration": duration,
+            "switched": switched,
+            "emergency": emergency,
+            "lanes": lanes,
+            "latency_ms": None,
+        }
+        if captured_at is not None:
+            decision["latency_ms"] = round((clock() - captured_at) * 1000, 3)
+            if self.metrics is not None:
+                self.metrics.set_gauge("decision_latency_ms", decision["latency_ms"])
+        self.last_decision = decision
+        return decision
+
+    def summary(self):
+        """
+        Compact form of the last decision for the live feed.
+        """
+        decision = self.last_decision
+        if decision is None:
+            return None
+        return {
+            "green_lane": decision["green_lane"],
+            "duration": decision["duration"],
+            "emergency": decision["emergency"],
+            "queues": {str(i): lane["count"] for i, lane in zip(self.lane_ids, decision["lanes"])},
+            "waits": {str(i): round(lane["wait_time"], 1) for i, lane in zip(self.lane_ids, decision["lanes"])},
+        }
@@ -1,19 +1,26 @@
+# Classes always present in the aggregated output, so traffic_total.csv / .json keep fixed columns
+TRAFFIC_CLASSES = ("car", "motorcycle", "bus", "bike", "person")
+
 def analyze_traffic_data(processed_data):
     """
     Aggregate and analyze results from multiple videos.
     Args:
         processed_data (list): List of per-video summaries (dicts with vehicle counts, etc.)
     Returns:
-        dict: Aggregated analytics for all input videos.
+        dict: Aggregated analytics for all input videos: every TRAFFIC_CLASSES key (0 when unseen)
+            plus any other class seen (summary fields such as total_vehicles are skipped).
     """
-    total = {"car": 0, "bus": 0, "bike": 0, "person": 0}
+    # Imported here so `python Logic/formula.py` (the Node.js CLI) runs without the package on sys.path
+    from Logic.aggregator import TrafficAggregator
+    aggregator = TrafficAggregator()
     for result in processed_data:
         # Defensive: skip if result is not a dict
         if not isinstance(result, dict):
             continue
-        for key in total:
-            total[key] += result.get(key, 0)
-    return total
+        aggregator.add_summary(result, camera=result.get("video"))
+    totals = {cls: 0 for cls in TRAFFIC_CLASSES}
+    totals.update(aggregator.totals())
+    return totals
 
 # -------------------------------
 # Adaptive Traffic Light Controller (Improved)
@@ -32,19 +32,21 @@ from src.detect_video import detect_video  # your YOLO detection function
 
 vehicle_classes = ["car", "bus", "bike", "person"]
 
-def process_video(video_path):
+def process_video(video_path, store_dir=None):
     """
     Process a video for vehicle detection & tracking.
-    Returns a summary dict with counts per vehicle type.
+    Returns a summary dict with counts per vehicle type: vehicles crossing the counting line,
+    the same numbers detect_video returns. If store_dir is given, per-track rows are also written
+    to a DetectionStore at store_dir/<video name> (replacing any earlier store there); use
+    DetectionStore(path).counts_by_class() on it for distinct tracks seen in the ROI.
     """
-    dets = detect_video(video_path)  # get detections frame-by-frame
-    summary = {cls: 0 for cls in vehicle_classes}
+    store_path = None
+    if store_dir:
+        store_path = os.path.join(store_dir, os.path.splitext(os.path.basename(video_path))[0])
+    crossings = detect_video(video_path, store_path=store_path)
 
-    # dets assumed as [[frame, x1, y1, x2, y2, score, class], ...]
-    for row in dets:
-        cls_name = row[6]  # assuming class is at index 6
-        if cls_name in summary:
-            summary[cls_name] += 1
+    summary = {cls: 0 for cls in vehicle_classes}
+    summary.update(crossings)
 
     summary["total_vehicles"] = sum(summary.values())
     summary["video"] = os.path.basename(video_path)
@@ -1,6 +1,7 @@
 const express = require('express');
 const app = express();
 const trafficDataRoute = require('./routes/trafficData');
+const liveFeedService = require('./services/liveFeedService');
 
 const cors = require('cors');
 app.use(cors());
@@ -8,6 +9,9 @@ app.use(cors());
 app.use(express.json());
 app.use('/api/traffic-data', trafficDataRoute);
 
+// Relay live counts pushed by the Python pipeline (python -m src.live ... --feed-port 8765)
+liveFeedService.start();
+
 const PORT = process.env.PORT || 3000;
 app.listen(PORT, () => {
   console.log(`Server running on port ${PORT}`);
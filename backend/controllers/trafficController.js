@@ -1,9 +1,35 @@
 const { spawn } = require('child_process');
 const path = require('path');
+const liveFeedService = require('../services/liveFeedService');
+const videoService = require('../services/videoService');
 
 // GET /api/traffic-data
+// Recent live counts from the Python feed, or the sample data until the feed has published.
 exports.getTrafficData = (req, res) => {
-  res.json({ message: "Traffic data fetched successfully" });
+  const history = liveFeedService.getHistory();
+  res.json(history.length > 0 ? history : videoService.getSampleTrafficData());
+};
+
+// GET /api/traffic-data/stream
+// Server-Sent Events: the latest update immediately, then every update the feed pushes.
+exports.streamTrafficData = (req, res) => {
+  res.set({
+    'Content-Type': 'text/event-stream',
+    'Cache-Control': 'no-cache',
+    Connection: 'keep-alive'
+  });
+  res.flushHeaders();
+
+  const send = update => res.write(`event: counts\ndata: ${JSON.stringify(update)}\n\n`);
+  const latest = liveFeedService.getLatest();
+  if (latest) send(latest);
+
+  const unsubscribe = liveFeedService.subscribe(send);
+  const keepalive = setInterval(() => res.write(': keepalive\n\n'), 15000);
+  req.on('close', () => {
+    clearInterval(keepalive);
+    unsubscribe();
+  });
 };
 
 // POST /api/traffic-data/signal-decision
@@ -1,9 +1,13 @@
-from multiprocessing import Pool
 from Logic.yolo import process_video
 from Logic.formula import analyze_traffic_data
 from src.detect_video import detect_video
+from src.metrics import load_reports, merge_reports, reports_to_prometheus, serve_prometheus, write_prometheus
+from src.scheduling import available_cores, calibrate, make_pool, plan_workers
+import argparse
 import csv
+import glob
 import json
+import os
 video_files = [
     "data/traffic1.mp4",
     "data/traffic2.mp4",
@@ -11,6 +15,10 @@ video_files = [
     "data/traffic4.mp4"
 ]
 
+# Per-video metrics reports written by the workers
+METRICS_DIR = "data/metrics"
+DEFAULT_WORKERS = 4
+
 def save_as_csv(results, file_path="data/traffic.csv"):
     """
     Save aggregated results to CSV
@@ -37,12 +45,41 @@ def process_single_video(video):
     Process a single video and return summary counts.
     """
     # Run detection (you can disable output_video_path or show_window if you want)
-    summary = detect_video(video, show_window=False)
+    name = os.path.splitext(os.path.basename(video))[0]
+    metrics_path = os.path.join(METRICS_DIR, f"{name}.json")
+    summary = detect_video(video, show_window=False, metrics_path=metrics_path)
     return summary
-def main():
+
+def main(metrics_port=None, workers=None, threads=None, pin=False, calibration_clip=None,
+         calibration_frames=60):
+    # Fresh metrics directory so reports from earlier runs are not aggregated
+    os.makedirs(METRICS_DIR, exist_ok=True)
+    for old_report in glob.glob(os.path.join(METRICS_DIR, "*.json")):
+        os.remove(old_report)
+
+    # Queue depth is read by the metrics endpoint while the pool runs
+    queue = {"videos_pending": len(video_files)}
+    server = None
+    if metrics_port:
+        server = serve_prometheus(lambda: reports_to_prometheus(load_reports(METRICS_DIR), queue),
+                                  port=metrics_port)
+        print(f"[Metrics] Serving http://127.0.0.1:{metrics_port}/metrics")
+
+    # Divide the cores between workers so torch/OpenCV/BLAS pools don't oversubscribe the machine
+    if calibration_clip:
+        (workers, threads), _ = calibrate(calibration_clip, max_frames=calibration_frames,
+                                          max_workers=len(video_files), pin=pin)
+    workers = workers or min(DEFAULT_WORKERS, len(video_files))
+    threads = threads or plan_workers(workers)[0]
+    print(f"[Pool] {workers} workers x {threads} threads on {len(available_cores())} cores"
+          f"{' (pinned)' if pin else ''}")
+
     # Process videos in parallel
-    with Pool(processes=4) as pool:
-        all_results = pool.map(process_single_video, video_files)
+    all_results = []
+    with make_pool(workers, threads, pin=pin) as pool:
+        for summary in pool.imap(process_single_video, video_files):
+            all_results.append(summary)
+            queue["videos_pending"] -= 1
 
     # Aggregate all video results using your formula.py logic
     aggregated_result = analyze_traffic_data(all_results)
@@ -55,8 +92,27 @@ def main():
     save_as_csv([aggregated_result], file_path="data/traffic_total.csv")
     save_as_json([aggregated_result], file_path="data/traffic_total.json")
 
+    # Per-stage timings across all workers
+    reports = load_reports(METRICS_DIR)
+    save_as_json(merge_reports(reports), file_path="data/metrics_summary.json")
+    write_prometheus(reports, "data/metrics.prom", queue)
+    if server is not None:
+        server.shutdown()
+
     print("Final Aggregated Result:")
     print(aggregated_result)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Process traffic videos in parallel")
+    parser.add_argument("--metrics-port", type=int, default=None,
+                        help="Serve Prometheus metrics on this port while processing")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes")
+    parser.add_argument("--threads", type=int, default=None,
+                        help="Intra-op threads per worker (default: cores // workers)")
+    parser.add_argument("--pin", action="store_true", help="Pin each worker to its own cores")
+    parser.add_argument("--calibrate", nargs="?", const=video_files[0], default=None, metavar="CLIP",
+                        help="Pick workers x threads by measuring throughput on a short clip")
+    parser.add_argument("--calibration-frames", type=int, default=60)
+    args = parser.parse_args()
+    main(metrics_port=args.metrics_port, workers=args.workers, threads=args.threads, pin=args.pin,
+         calibration_clip=args.calibrate, calibration_frames=args.calibration_frames)
\ No newline at end of file
@@ -4,6 +4,7 @@ const trafficController = require('../controllers/trafficController');
 
 // Existing routes
 router.get('/', trafficController.getTrafficData);
+router.get('/stream', trafficController.streamTrafficData);
 
 // Add this POST route!
 router.post('/signal-decision', trafficController.postSignalDecision);
@@ -0,0 +1,93 @@
+const http = require('http');
+const { EventEmitter } = require('events');
+
+// Relays the Python pipeline's Server-Sent Events feed (src/live_feed.py) to dashboard clients.
+// The latest update and a short history are kept in memory, so REST reads never touch disk.
+// History points are vehicles per minute (like sampleData.json), derived from the feed's running
+// total; every relayed update carries its minute's point as `interval`.
+const FEED_URL = process.env.PYTHON_FEED_URL || 'http://127.0.0.1:8765/events';
+const RECONNECT_MS = 2000;
+const HISTORY_LENGTH = 120;   // minutes
+const INTERVAL_MS = 60000;
+
+const emitter = new EventEmitter();
+emitter.setMaxListeners(0);
+
+let latest = null;
+let lastEventId = null;
+let lastTotal = null;
+const history = [];
+let started = false;
+
+function handleEvent(data) {
+  let update;
+  try {
+    update = JSON.parse(data);
+  } catch (e) {
+    return;
+  }
+  // Crossings since the previous event; a smaller total means the pipeline restarted
+  const delta = lastTotal === null || update.total < lastTotal ? update.total : update.total - lastTotal;
+  lastTotal = update.total;
+
+  const start = Math.floor((update.ts * 1000) / INTERVAL_MS) * INTERVAL_MS;
+  let point = history[history.length - 1];
+  if (!point || Date.parse(point.timestamp) < start) {
+    point = { timestamp: new Date(start).toISOString(), vehicleCount: 0 };
+    history.push(point);
+    if (history.length > HISTORY_LENGTH) history.shift();
+  }
+  point.vehicleCount += delta;
+
+  latest = { ...update, interval: { ...point } };
+  emitter.emit('update', latest);
+}
+
+function connect() {
+  // Resume after the last event seen, so crossings emitted while disconnected are replayed
+  const headers = lastEventId ? { 'Last-Event-ID': lastEventId } : {};
+  const req = http.get(FEED_URL, { headers }, res => {
+    if (res.statusCode !== 200) {
+      res.resume();
+      return setTimeout(connect, RECONNECT_MS);
+    }
+    res.setEncoding('utf8');
+    let buffer = '';
+    res.on('data', chunk => {
+      buffer += chunk;
+      let end;
+      // SSE events are separated by a blank line
+      while ((end = buffer.indexOf('\n\n')) !== -1) {
+        const block = buffer.slice(0, end);
+        buffer = buffer.slice(end + 2);
+        const lines = block.split('\n');
+        const id = lines.find(line => line.startsWith('id:'));
+        if (id) lastEventId = id.slice(3).trim();
+        const data = lines
+          .filter(line => line.startsWith('data:'))
+          .map(line => line.slice(5).trim())
+          .join('\n');
+        if (data) handleEvent(data);
+      }
+    });
+    res.on('end', () => setTimeout(connect, RECONNECT_MS));
+  });
+  req.on('error', () => setTimeout(connect, RECONNECT_MS));
+}
+
+exports.start = () => {
+  if (!started) {
+    started = true;
+    connect();
+  }
+};
+
+exports.getLatest = () => latest;
+
+exports.getHistory = () => history.slice();
+
+// Returns an unsubscribe function
+exports.subscribe = listener => {
+  emitter.on('update', listener);
+  return () => emitter.off('update', listener);
+};
@@ -1,11 +1,15 @@
 const fs = require('fs');
 const path = require('path');
 
-// Stub: Returns sample data, replace with real video processing later
+// Sample data is read once and served from memory afterwards
+let sampleData = null;
+
 exports.getSampleTrafficData = () => {
-  const dataPath = path.join(__dirname, '../data/sampleData.json');
-  const raw = fs.readFileSync(dataPath);
-  return JSON.parse(raw);
+  if (!sampleData) {
+    const dataPath = path.join(__dirname, '../data/sampleData.json');
+    sampleData = JSON.parse(fs.readFileSync(dataPath));
+  }
+  return sampleData;
 };
 
-// Future: add actual video processing functions here
\ No newline at end of file
+// Future: add actual video processing functions here
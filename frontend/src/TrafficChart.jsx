@@ -10,6 +10,26 @@ import {
   ReferenceLine
 } from "recharts";
 
+const MAX_POINTS = 120;
+
+// Every point is a vehicles-per-minute count, labelled HH:MM
+function toPoint(timestamp, vehicleCount) {
+  const ts = new Date(timestamp).getTime();
+  return {
+    ts,
+    time: new Date(ts).toLocaleTimeString([], { hour: '2-digit', minute: '2-digit' }),
+    vehicles: vehicleCount
+  };
+}
+
+// Merge points from the REST history and the live stream by timestamp (ms), newest last;
+// a later point for the same minute replaces the earlier one
+function mergePoints(a, b) {
+  const byTs = new Map();
+  [...a, ...b].forEach(point => byTs.set(point.ts, point));
+  return [...byTs.values()].sort((x, y) => x.ts - y.ts).slice(-MAX_POINTS);
+}
+
 export default function TrafficGraph({ apiUrl = "http://localhost:3000/api/traffic-data" }) {
   const [trafficData, setTrafficData] = useState([]);
   const [loading, setLoading] = useState(true);
@@ -23,20 +43,32 @@ export default function TrafficGraph({ apiUrl = "http://localhost:3000/api/traff
         return res.json();
       })
       .then((data) => {
-        const formatted = data.map(item => ({
-          time: new Date(item.timestamp).toLocaleTimeString([], { hour: '2-digit', minute: '2-digit' }),
-          vehicles: item.vehicleCount
-        }));
-        setTrafficData(formatted);
+        const formatted = data.map(item => toPoint(item.timestamp, item.vehicleCount));
+        // Stream events may have arrived before the history; keep them
+        setTrafficData((prev) => mergePoints(formatted, prev));
         setError(null);
       })
       .catch((err) => {
         setError(`Failed to load traffic data: ${err.message}`);
-        setTrafficData([]);
       })
       .finally(() => setLoading(false));
   }, [apiUrl]);
 
+  // Live updates pushed by the backend (Server-Sent Events), no polling
+  useEffect(() => {
+    const source = new EventSource(`${apiUrl}/stream`);
+    source.addEventListener("counts", (event) => {
+      // `interval` is this minute's count so far (the feed's `total` is a running total)
+      const { interval } = JSON.parse(event.data);
+      if (!interval) return;
+      const point = toPoint(interval.timestamp, interval.vehicleCount);
+      setTrafficData((prev) => mergePoints(prev, [point]));
+      setLoading(false);
+      setError(null);
+    });
+    return () => source.close();
+  }, [apiUrl]);
+
   const average =
     trafficData.length > 0
       ? trafficData.reduce((sum, d) => sum + d.vehicles, 0) / trafficData.length
@@ -0,0 +1,153 @@
+import csv
+from collections import deque
+
+# Candidate YOLO input sizes (multiples of the model stride, 32)
+INFERENCE_SIZES = (320, 416, 512, 640, 768)
+DEFAULT_SIZE = 640
+
+SMALL_OBJECT_FRACTION = 0.004   # box area / ROI area below this counts as a small object
+LARGE_OBJECT_FRACTION = 0.03    # median box area / ROI area above this means vehicles are large
+MIN_SMALL_OBJECTS = 3           # small objects per frame needed to ask for more resolution
+EWMA_ALPHA = 0.2                # smoothing of per-size latency estimates
+STALE_DECAY = 0.2               # per decision, pull unmeasured over-target estimates toward the scaled prediction
+
+
+class ResolutionController:
+    """
+    Picks the inference size for each frame from a latency target and recent detection density.
+
+    Resolution steps down when the ROI is empty or vehicles are large, and steps up when many
+    small objects appear, but never to a size whose predicted latency exceeds the target.
+    Latency per size is tracked with an EWMA; sizes not yet tried are predicted by scaling a
+    measured size by its pixel count. The first inference at each size is not used (it includes
+    model warm-up). Decisions are made once per `window` frames so the size does not flap, except
+    that a size whose measured latency goes over the target is left on the next frame.
+
+    Estimates over the target decay toward the prediction from the current size once per decision,
+    so a size ruled out by one slow spell is tried again later; every probe that fails halves that
+    size's decay, so a size that really is too slow is retried less and less often.
+    """
+
+    def __init__(self, latency_target_ms, sizes=INFERENCE_SIZES, initial_size=DEFAULT_SIZE, window=10,
+                 log_path=None):
+        self.latency_target_ms = latency_target_ms
+        self.sizes = sorted(sizes)
+        self.index = self.sizes.index(initial_size) if initial_size in self.sizes else len(self.sizes) // 2
+        self.window = window
+        self.latency_ms = {}                       # size -> EWMA latency
+        self.samples = {}                          # size -> inferences seen (the first is discarded)
+        self.failed_probes = {}                    # size -> consecutive times it was left for being too slow
+        self.recent = deque(maxlen=window)         # (detections, small, median_fraction)
+        self.frames_since_change = 0
+        self.log = deque(maxlen=1000)              # (frame_id, size, latency_ms, detections)
+
+        self._log_file = None
+        self._log_writer = None
+        if log_path:
+            self._log_file = open(log_path, mode="w", newline="")
+            self._log_writer = csv.writer(self._log_file)
+            self._log_writer.writerow(["frame_id", "imgsz", "latency_ms", "detections", "small_objects"])
+
+    @property
+    def size(self):
+        return self.sizes[self.index]
+
+    def predicted_latency(self, size):
+        if size in self.latency_ms:
+            return self.latency_ms[size]
+        return self._scaled_latency(size)
+
+    def _scaled_latency(self, size, ref_size=None):
+        if ref_size is None:
+            measured = [s for s in self.latency_ms if s != size]
+            if not measured:
+                return 0.0
+            ref_size = min(measured, key=lambda s: abs(s - size))
+        return self.latency_ms[ref_size] * (size / ref_size) ** 2
+
+    def observe(self, frame_id, latency_ms, boxes, roi_shape):
+        """
+        Record one inference and update the size for the next frame.
+        Args:
+            frame_id: Frame number, for the log.
+            latency_ms: Measured inference time at the current size.
+            boxes: Kept detections as [[x1, y1, x2, y2, ...], ...] in any coordinates with the ROI's scale.
+            roi_shape: (height, width) of the ROI the boxes refer to.
+        Returns:
+            int: Inference size to use for the next frame.
+        """
+        size = self.size
+        self.samples[size] = self.samples.get(size, 0) + 1
+        if self.samples[size] > 1:  # the first call at a size includes warm-up
+            prev = self.latency_ms.get(size)
+            self.latency_ms[size] = latency_ms if prev is None else prev + EWMA_ALPHA * (latency_ms - prev)
+
+        roi_area = float(roi_shape[0] * roi_shape[1]) or 1.0
+        fractions = sorted(max(0.0, (b[2] - b[0]) * (b[3] - b[1])) / roi_area for b in boxes)
+        small = sum(1 for f in fractions if f < SMALL_OBJECT_FRACTION)
+        median = fractions[len(fractions) // 2] if fractions else 0.0
+        self.recent.append((len(fractions), small, median))
+
+        self.log.append((frame_id, size, round(latency_ms, 3), len(fractions)))
+        if self._log_writer:
+            self._log_writer.writerow([frame_id, size, round(latency_ms, 3), len(fractions), small])
+
+        self.frames_since_change += 1
+        if self.index > 0 and self.latency_ms.get(size, 0.0) > self.latency_target_ms:
+            self._step_down()
+        elif self.frames_since_change >= self.window:
+            self._decide()
+        return self.size
+
+    def _set_index(self, index):
+        if index != self.index:
+            self.index = index
+            self.recent.clear()
+        self.frames_since_change = 0
+
+    def _step_down(self):
+        """
+        Leave a size whose measured latency is over the target without waiting for the window.
+        """
+        size = self.size
+        self.failed_probes[size] = self.failed_probes.get(size, 0) + 1
+        target = self.index - 1
+        while target > 0 and self.predicted_latency(self.sizes[target]) > self.latency_target_ms:
+            target -= 1
+        self._set_index(target)
+
+    def _decide(self):
+        n = len(self.recent)
+        mean_dets = sum(r[0] for r in self.recent) / n
+        mean_small = sum(r[1] for r in self.recent) / n
+        mean_median = sum(r[2] for r in self.recent) / n
+
+        target = self.index
+        if mean_small >= MIN_SMALL_OBJECTS:
+            target = self.index + 1
+        elif mean_dets == 0 or mean_median > LARGE_OBJECT_FRACTION:
+            target = self.index - 1
+        target = max(0, min(len(self.sizes) - 1, target))
+
+        # Estimates over the target are never refreshed by measurement; let them relax toward
+        # what the current size predicts so that the size can be probed again
+        current = self.size
+        if current in self.latency_ms:
+            if self.latency_ms[current] <= self.latency_target_ms:
+                self.failed_probes.pop(current, None)  # held a full window within the target
+            for other, estimate in self.latency_ms.items():
+                if other != current and estimate > self.latency_target_ms:
+                    scaled = self._scaled_latency(other, current)
+                    decay = STALE_DECAY * 0.5 ** self.failed_probes.get(other, 0)
+                    self.latency_ms[other] = estimate + decay * (scaled - estimate)
+
+        # Latency budget caps the size, also forcing a step down when the current size is too slow
+        while target > 0 and self.predicted_latency(self.sizes[target]) > self.latency_target_ms:
+            target -= 1
+
+        self._set_index(target)
+
+    def close(self):
+        if self._log_file:
+            self._log_file.close()
+            self._log_file = None
@@ -1,163 +1,204 @@
 import cv2
-import datetime
-import numpy as np
-import csv
 import os
-from src.sort import Sort  # Correct import for your structure
-from ultralytics import YOLO  # pip install ultralytics
-
-vehicle_classes = ['car', 'motorcycle', 'bus', 'person', 'bike']
-
-# Load YOLO model once
-model = YOLO("../models/yolov8n.pt")
-
-def detect_video(video_path, output_video_path=None, log_csv_path=None, show_window=False):
-    cap = cv2.VideoCapture(video_path)
+from src.zones import LaneCounter
+from src.video_source import DEFAULT_ROI, DEFAULT_MAX_SIZE, open_frame_source
+from src.utils import save_lane_results_to_csv
+from src.metrics import PipelineMetrics, clock
+from src.live import LatestFrameGrabber
+from src.adaptive import ResolutionController
+from src.detection_store import DetectionStore
+from src.frame_processor import FrameProcessor, open_csv_log, vehicle_classes
+from Logic.controller import SignalController
+
+MODEL_PATH = "../models/yolov8n.pt"
+model = None
+
+def get_model():
+    """
+    Load the YOLO model once per process, on first use.
+    """
+    global model
+    if model is None:
+        from ultralytics import YOLO  # pip install ultralytics
+        model = YOLO(MODEL_PATH)
+    return model
+
+def detect_video(video_path, output_video_path=None, log_csv_path=None, show_window=False,
+                 lanes=None, lane_results_prefix=None, decoder="opencv", roi=DEFAULT_ROI,
+                 frame_stride=1, start_frame=0, max_size=DEFAULT_MAX_SIZE,
+                 metrics=None, metrics_path=None, metrics_interval=100,
+                 live=False, latency_budget_ms=None, realtime=False,
+                 latency_target_ms=None, resolution_log_path=None, store_path=None, feed=None,
+                 max_frames=None, signal=None, aggregator=None):
+    """
+    Detect, track and count vehicles in a video.
+    Args:
+        video_path: Path to the input video.
+        output_video_path: Optional path for the annotated output video.
+        log_csv_path: Optional path for the per-track detection CSV.
+        show_window: Show the annotated frames in a window.
+        lanes: Optional LaneCounter, list of lane dicts or path to a lane JSON config (see src/zones.py).
+            All lanes are counted in the same pass; read them back from LaneCounter.lane_counts.
+        lane_results_prefix: If set with lanes, save per-lane counts via save_lane_results_to_csv.
+        decoder: "opencv" decodes full frames; "ffmpeg" decodes only the ROI, downscaled to max_size,
+            into a preallocated buffer (annotated output is then the ROI image).
+        roi: Region of interest as frame fractions (x0, y0, x1, y1).
+        frame_stride: Process every n-th frame; skipped frames are not converted (or are seeked over).
+        start_frame: Number of frames to skip at the start of the video.
+        max_size: Longest side of the decoded ROI on the ffmpeg path.
+        metrics: Optional PipelineMetrics to record per-stage timings into (one is created otherwise).
+        metrics_path: If set, write the JSON metrics report here every metrics_interval frames
+            and at the end of the run.
+        live: Latency-bounded mode for cameras/streams: frames are read on a background thread,
+            only the newest is processed and the rest are dropped.
+        latency_budget_ms: In live mode, also skip frames that are already older than this when
+            the detector is ready for them.
+        realtime: In live mode, replay a file at its native frame rate (simulates a camera).
+        latency_target_ms: If set, adapt the inference size per frame to this inference latency
+            and to detection density (see src/adaptive.py).
+        resolution_log_path: Optional CSV log of the chosen sizes and measured latencies.
+        store_path: Optional directory for a memory-mapped columnar DetectionStore of the
+            per-track rows (indexed by frame, track and class; see src/detection_store.py).
+        feed: Optional CountFeed (src/live_feed.py) that receives count and crossing updates
+            as they happen, for the dashboard's live stream.
+        max_frames: Stop after processing this many frames (e.g. for calibration runs).
+        signal: Optional SignalController, list of lane dicts or path to a lane JSON config. Lane
+            queues and wait times are derived from the live tracks and fed to decide_green_lane
+            on every frame (see Logic/controller.py); read the result from .last_decision.
+        aggregator: Optional TrafficAggregator (Logic/aggregator.py) that receives every crossing as
+            it happens (lane crossings when lanes are set), for windowed counts and rollups.
+    Returns:
+        dict: Cumulative crossing counts per class on the default counting line.
+    """
+    source = open_frame_source(video_path, decoder=decoder, roi=roi, frame_stride=frame_stride,
+                               start_frame=start_frame, max_size=max_size)
+    box_x0, box_y0, box_x1, box_y1 = source.roi_box
+    roi_x0, roi_y0, roi_x1, roi_y1 = source.roi_source
     fourcc = cv2.VideoWriter_fourcc(*'mp4v')
     out = None
-    csv_writer = None
-
+    csv_file = csv_writer = None
     if log_csv_path:
-        csv_file = open(log_csv_path, mode="w", newline="")
-        csv_writer = csv.writer(csv_file)
-        csv_writer.writerow(["timestamp", "frame_id", "track_id", "class", "confidence", "x1", "y1", "x2", "y2"])
-
-    frame_id = 0
-    cumulative_counts = {}
-    cumulative_total = 0
-    tracker = Sort()
-    counted_ids = set()
-    track_last_positions = {}
-
-    while cap.isOpened():
-        ret, frame = cap.read()
-        if not ret:
-            break
-        frame_id += 1
+        csv_file, csv_writer = open_csv_log(log_csv_path)
+
+    lane_counter = None
+    if lanes is not None:
+        lane_counter = lanes if isinstance(lanes, LaneCounter) else LaneCounter(lanes)
+    if metrics is None:
+        metrics = PipelineMetrics(video=os.path.basename(str(video_path)))
+    grabber = LatestFrameGrabber(source, realtime=realtime) if live else None
+    resolution = None
+    if latency_target_ms is not None:
+        resolution = ResolutionController(latency_target_ms, log_path=resolution_log_path)
+    roi_shape = (roi_y1 - roi_y0, roi_x1 - roi_x0)
+    store = DetectionStore(store_path, mode="w") if store_path else None
+    signal_controller = None
+    if signal is not None:
+        signal_controller = (signal if isinstance(signal, SignalController)
+                             else SignalController(signal, metrics=metrics))
+    fps = source.fps or 25.0
+
+    # Post-inference path; annotation is skipped entirely when nothing would display it
+    processor = FrameProcessor(source.roi_source, roi_box=source.roi_box, origin=source.origin,
+                               scale=source.scale, lane_counter=lane_counter, csv_writer=csv_writer,
+                               store=store, feed=feed, metrics=metrics,
+                               annotate=bool(output_video_path or show_window),
+                               signal_controller=signal_controller, aggregator=aggregator,
+                               camera=os.path.basename(str(video_path)))
+    yolo = get_model()
+    last_frame_id = None
+
+    while True:
+        t = clock()
+        if grabber is not None:
+            item = grabber.read()
+            if item is None:
+                break
+            frame_id, frame, captured_at = item
+            if latency_budget_ms is not None and (t - captured_at) * 1000 > latency_budget_ms:
+                metrics.incr("stale_frames")
+                continue
+        else:
+            item = source.read()
+            if item is None:
+                break
+            frame_id, frame = item
+            captured_at = t
+        # Frames skipped by frame_stride or dropped in live mode advance the tracker's motion model
+        dt = frame_id - last_frame_id if last_frame_id is not None else 1
+        last_frame_id = frame_id
+        t = metrics.lap("decode", t)
         h, w = frame.shape[:2]
 
-        # ROI: bigger horizontal strip of right half
-        y_start = int(h * 0.4)
-        y_end = int(h * 0.8)
-        roi = frame[y_start:y_end, w//2:]
-        roi_x_offset = w // 2
-        roi_y_offset = y_start
+        # ROI: bigger horizontal strip of right half (a view, no copy)
+        roi_image = frame[box_y0:box_y1, box_x0:box_x1]
 
-        results = model(roi)[0]
+        if resolution is not None:
+            imgsz = resolution.size
+            results = yolo(roi_image, imgsz=imgsz, verbose=False)[0]
+        else:
+            results = yolo(roi_image)[0]
+        t_inference = t
+        t = metrics.lap("inference", t)
         boxes = results.boxes
-        names = results.names
 
         detections = []
         if boxes is not None and boxes.shape[0] > 0:
-            boxes_np = boxes.xyxy.cpu().numpy()
-            confs_np = boxes.conf.cpu().numpy()
-            clss_np = boxes.cls.cpu().numpy().astype(int)
-
-            for i in range(len(boxes_np)):
-                class_id = clss_np[i]
-                label = names[class_id]
-                conf = confs_np[i]
-                if label in vehicle_classes and conf > 0.2:
-                    xmin = boxes_np[i][0] + roi_x_offset
-                    ymin = boxes_np[i][1] + roi_y_offset
-                    xmax = boxes_np[i][2] + roi_x_offset
-                    ymax = boxes_np[i][3] + roi_y_offset
-                    detections.append([xmin, ymin, xmax, ymax, conf, label])
-
-        dets = np.array([d[:5] for d in detections])
-        tracked_objects = tracker.update(dets) if len(dets) > 0 else np.empty((0,5))
-
-        # Counting line logic
-        counting_line_y = int(y_start + (y_end - y_start) * 0.5)
-        annotated_frame = frame.copy()
-        cv2.line(annotated_frame, (roi_x_offset, counting_line_y), (w, counting_line_y), (0,0,255), 2)
-
-        current_ids = set()
-        for track in tracked_objects:
-            x1, y1, x2, y2, track_id = track
-            cx = int((x1 + x2) / 2)
-            cy = int((y1 + y2) / 2)
-            current_ids.add(track_id)
-            prev_cy = track_last_positions.get(track_id, None)
-            track_last_positions[track_id] = cy
-
-            # IoU match for class assignment
-            best_match = None
-            best_iou = 0
-            for det in detections:
-                dx1, dy1, dx2, dy2, dconf, dlabel = det
-                xx1 = max(x1, dx1)
-                yy1 = max(y1, dy1)
-                xx2 = min(x2, dx2)
-                yy2 = min(y2, dy2)
-                w_inter = max(0, xx2 - xx1)
-                h_inter = max(0, yy2 - yy1)
-                inter = w_inter * h_inter
-                area1 = (x2 - x1) * (y2 - y1)
-                area2 = (dx2 - dx1) * (dy2 - dy1)
-                union = area1 + area2 - inter
-                iou = inter / union if union > 0 else 0
-                if iou > best_iou:
-                    best_iou = iou
-                    best_match = det
-
-            # Count only when center crosses the line
-            if prev_cy is not None and prev_cy < counting_line_y and cy >= counting_line_y:
-                if int(track_id) not in counted_ids:
-                    counted_ids.add(int(track_id))
-                    if best_match is not None:
-                        label = best_match[5]
-                        conf = best_match[4]
-                        cumulative_counts[label] = cumulative_counts.get(label, 0) + 1
-                        cumulative_total += 1
-
-            # CSV logging
-            if csv_writer:
-                timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                csv_writer.writerow([
-                    timestamp, frame_id, int(track_id),
-                    best_match[5] if best_match else "unknown",
-                    round(float(best_match[4]),2) if best_match else 0,
-                    int(x1), int(y1), int(x2), int(y2)
-                ])
-
-            # Draw rectangle and label
-            box_label = f"ID:{int(track_id)}"
-            if best_match is not None:
-                box_label += f" {best_match[5]} {best_match[4]:.2f}"
-            cv2.rectangle(annotated_frame, (int(x1), int(y1)), (int(x2), int(y2)), (0, 255, 0), 2)
-            cv2.putText(annotated_frame, box_label, (int(x1), int(y1)-5),
-                        cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0,255,0), 2)
-
-        track_last_positions = {tid: pos for tid, pos in track_last_positions.items() if tid in current_ids}
-
-        # Display cumulative counts
-        y_disp = 30
-        for label, count in cumulative_counts.items():
-            text = f"{label}: {count}"
-            cv2.putText(annotated_frame, text, (10, y_disp),
-                        cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0,255,0), 2)
-            y_disp += 30
-        cv2.putText(annotated_frame, f"Total: {cumulative_total}", (10, y_disp+10),
-                    cv2.FONT_HERSHEY_SIMPLEX, 0.8, (255,0,0), 2)
+            detections = processor.filter_detections(boxes.xyxy.cpu().numpy(), boxes.conf.cpu().numpy(),
+                                                     boxes.cls.cpu().numpy().astype(int), results.names)
+        if resolution is not None:
+            inference_ms = (t - t_inference) * 1000
+            resolution.observe(frame_id, inference_ms, detections, roi_shape)
+            metrics.set_gauge("imgsz", imgsz)
+            metrics.set_gauge("inference_ms", round(inference_ms, 3))
+        metrics.lap("filter", t)
+
+        annotated_frame = processor.process(frame_id, frame, detections, dt=dt,
+                                            scene_time=frame_id / fps, captured_at=captured_at)
+        t = clock()
 
         if output_video_path and out is None:
             out = cv2.VideoWriter(output_video_path, fourcc, 20.0, (w,h))
         if out:
             out.write(annotated_frame)
+            t = metrics.lap("encode", t)
 
         # Show video pop-up if enabled
         if show_window:
             cv2.imshow('Annotated Frame', annotated_frame)
             if cv2.waitKey(1) & 0xFF == ord('q'):
                 break
+            metrics.lap("display", t)
+
+        metrics.incr("frames")
+        metrics.set_gauge("last_frame_id", frame_id)
+        metrics.set_gauge("latency_ms", round((clock() - captured_at) * 1000, 3))
+        if grabber is not None:
+            metrics.set_gauge("queue_depth", grabber.pending())
+            metrics.counters["dropped_frames"] = grabber.dropped
+        if metrics_path and metrics.counters["frames"] % metrics_interval == 0:
+            metrics.write_json(metrics_path)
+        if max_frames is not None and metrics.counters["frames"] >= max_frames:
+            break
 
-    cap.release()
+    if resolution is not None:
+        resolution.close()
+    if store is not None:
+        store.close()
+    if grabber is not None:
+        grabber.stop(release=True)  # the grabber thread may still be reading the source
+        metrics.counters["dropped_frames"] = grabber.dropped
+    else:
+        source.release()
     if out is not None:
         out.release()
-    if csv_writer:
+    if csv_file:
         csv_file.close()
     if show_window:
         cv2.destroyAllWindows()
+    if lane_counter is not None and lane_results_prefix:
+        save_lane_results_to_csv(lane_counter.lane_counts, file_prefix=lane_results_prefix)
+    metrics.finish()
+    if metrics_path:
+        metrics.write_json(metrics_path)
 
-    return cumulative_counts
+    return processor.cumulative_counts
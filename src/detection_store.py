@@ -0,0 +1,308 @@
+import json
+import os
+import time
+import numpy as np
+
+# Fixed-dtype columns, one append-only binary file each (<store>/<column>.bin)
+COLUMNS = {
+    "frame": np.int32,
+    "track": np.int32,
+    "cls": np.int16,       # index into meta["classes"], -1 for unknown
+    "conf": np.float32,
+    "x1": np.float32,
+    "y1": np.float32,
+    "x2": np.float32,
+    "y2": np.float32,
+    "ts": np.float64,
+}
+UNKNOWN_CLASS = -1
+FLUSH_ROWS = 4096          # rows buffered in memory before they are appended to disk
+QUERY_CHUNK_ROWS = 1 << 18  # rows gathered per step by whole-range aggregate queries
+META_FILE = "meta.json"
+
+
+class DetectionStore:
+    """
+    Append-only, memory-mapped columnar store of per-frame track rows.
+
+    Rows are appended in frame order, so the frame column is sorted and frame ranges are found
+    by binary search. build_indexes() writes track and class postings (row ids grouped by track /
+    class); rows appended after the last build are covered by scanning only that tail. Queries
+    read memory-mapped columns, so only the pages they touch are loaded.
+
+    Usage:
+        store = DetectionStore("data/detections/traffic1", mode="w")
+        store.append_many(frame_id, tracked_objects, labels, confs)
+        store.close()          # flushes and builds indexes
+
+        store = DetectionStore("data/detections/traffic1")
+        store.count("car", 100, 200)
+        store.trajectory(7)
+    """
+
+    def __init__(self, path, mode="r"):
+        if mode not in ("r", "a", "w"):
+            raise ValueError(f"Unknown mode: {mode}")
+        self.path = path
+        self.mode = mode
+        self._buffer = {name: [] for name in COLUMNS}
+        self._maps = {}
+        meta_path = os.path.join(path, META_FILE)
+
+        if mode == "w" or (mode == "a" and not os.path.exists(meta_path)):
+            os.makedirs(path, exist_ok=True)
+            self.meta = {"length": 0, "indexed": 0, "classes": [], "columns": {
+                name: np.dtype(dtype).str for name, dtype in COLUMNS.items()}}
+            for name in COLUMNS:
+                open(self._file(name), "wb").close()
+            self._write_meta()
+        else:
+            with open(meta_path) as f:
+                self.meta = json.load(f)
+        self._class_ids = {name: i for i, name in enumerate(self.meta["classes"])}
+
+    # ---------------------------
+    # Writing
+    # ---------------------------
+    def _file(self, name):
+        return os.path.join(self.path, f"{name}.bin")
+
+    def _write_meta(self):
+        tmp_path = os.path.join(self.path, META_FILE + ".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(self.meta, f, indent=4)
+        os.replace(tmp_path, os.path.join(self.path, META_FILE))
+
+    def class_id(self, label):
+        if label is None or label == "unknown":
+            return UNKNOWN_CLASS
+        if label not in self._class_ids:
+            self._class_ids[label] = len(self.meta["classes"])
+            self.meta["classes"].append(label)
+        return self._class_ids[label]
+
+    def append_many(self, frame_id, tracks, labels, confs, ts=None):
+        """
+        Append one frame's tracks.
+        Args:
+            frame_id: Frame number; must not decrease between calls.
+            tracks: (N, 5) array of [x1, y1, x2, y2, track_id] as returned by Sort.update.
+            labels: N class labels (None / "unknown" when unmatched).
+            confs: N confidences.
+            ts: Wall-clock timestamp for the frame (defaults to now).
+        """
+        if self.mode == "r":
+            raise IOError("DetectionStore opened read-only")
+        n = len(tracks)
+        if n == 0:
+            return
+        last = self._buffer["frame"][-1][-1] if self._buffer["frame"] else self._last_frame()
+        if last is not None and frame_id < last:
+            raise ValueError(f"Frames must be appended in order ({frame_id} < {last})")
+        tracks = np.asarray(tracks)
+        buf = self._buffer
+        buf["frame"].append(np.full(n, frame_id, dtype=COLUMNS["frame"]))
+        buf["track"].append(tracks[:, 4].astype(COLUMNS["track"]))
+        buf["cls"].append(np.array([self.class_id(l) for l in labels], dtype=COLUMNS["cls"]))
+        buf["conf"].append(np.asarray(confs, dtype=COLUMNS["conf"]))
+        for i, name in enumerate(("x1", "y1", "x2", "y2")):
+            buf[name].append(tracks[:, i].astype(COLUMNS[name]))
+        buf["ts"].append(np.full(n, time.time() if ts is None else ts, dtype=COLUMNS["ts"]))
+        if sum(len(a) for a in buf["frame"]) >= FLUSH_ROWS:
+            self.flush()
+
+    def _last_frame(self):
+        n = self.meta["length"]
+        return int(self.column("frame")[n - 1]) if n else None
+
+    def flush(self):
+        if not self._buffer["frame"]:
+            return
+        added = 0
+        for name, chunks in self._buffer.items():
+            data = np.concatenate(chunks)
+            with open(self._file(name), "ab") as f:
+                f.write(data.tobytes())
+            added = len(data)
+            chunks.clear()
+        self.meta["length"] += added
+        self._maps.clear()
+        self._write_meta()
+
+    def build_indexes(self):
+        """
+        Write track and class postings: row ids sorted by key (stable, so ascending within a key)
+        plus per-key offsets. Built with a two-pass counting sort over column chunks written
+        straight into a memory-mapped file, so memory is bounded by the chunk and the key range.
+        """
+        self.flush()
+        self._maps.clear()  # drop mappings of the postings files about to be rewritten
+        n = self.meta["length"]
+        for key in ("track", "cls"):
+            self._write_postings(key, n)
+        self.meta["indexed"] = n
+        self._maps.clear()
+        self._write_meta()
+
+    def _write_postings(self, key, n):
+        column = self.column(key)
+        rows_path = os.path.join(self.path, f"{key}_rows.idx")
+        offsets_path = os.path.join(self.path, f"{key}_offsets.idx")
+        if n == 0:
+            open(rows_path, "wb").close()
+            np.empty((0, 2), dtype=np.int64).tofile(offsets_path)
+            return
+        chunks = [(start, min(start + QUERY_CHUNK_ROWS, n)) for start in range(0, n, QUERY_CHUNK_ROWS)]
+        # Pass 1: key range and per-key row counts
+        low = min(int(column[a:b].min()) for a, b in chunks)
+        high = max(int(column[a:b].max()) for a, b in chunks)
+        counts = np.zeros(high - low + 1, dtype=np.int64)
+        for a, b in chunks:
+            counts += np.bincount(np.asarray(column[a:b], dtype=np.int64) - low, minlength=len(counts))
+        starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+        # Pass 2: scatter each chunk's row ids to their key's next free slots
+        rows = np.memmap(rows_path, dtype=np.int64, mode="w+", shape=(n,))
+        cursor = starts.copy()
+        for a, b in chunks:
+            values = np.asarray(column[a:b], dtype=np.int64) - low
+            order = np.argsort(values, kind="stable")
+            sorted_values = values[order]
+            present, first, hits = np.unique(sorted_values, return_index=True, return_counts=True)
+            rank = np.arange(len(order)) - np.repeat(first, hits)
+            rows[cursor[sorted_values] + rank] = order + a
+            cursor[present] += hits
+        rows.flush()
+        del rows
+        used = np.nonzero(counts)[0]
+        np.stack([used + low, starts[used]], axis=1).astype(np.int64).tofile(offsets_path)
+
+    def close(self):
+        if self.mode != "r":
+            self.build_indexes()
+
+    # ---------------------------
+    # Reading
+    # ---------------------------
+    def __len__(self):
+        return self.meta["length"]
+
+    def column(self, name):
+        """
+        Memory-mapped view of a column's flushed rows.
+        """
+        if name not in self._maps:
+            n = self.meta["length"]
+            if n == 0:
+                self._maps[name] = np.empty(0, dtype=COLUMNS[name])
+            else:
+                self._maps[name] = np.memmap(self._file(name), dtype=COLUMNS[name], mode="r", shape=(n,))
+        return self._maps[name]
+
+    def _postings(self, key):
+        cache_key = f"{key}_idx"
+        if cache_key not in self._maps:
+            rows_path = os.path.join(self.path, f"{key}_rows.idx")
+            if not self.meta["indexed"] or not os.path.exists(rows_path):
+                self._maps[cache_key] = None
+            else:
+                rows = np.memmap(rows_path, dtype=np.int64, mode="r")
+                offsets = np.fromfile(os.path.join(self.path, f"{key}_offsets.idx"), dtype=np.int64).reshape(-1, 2)
+                self._maps[cache_key] = (rows, offsets[:, 0], offsets[:, 1])
+        return self._maps[cache_key]
+
+    def rows_for(self, key, value):
+        """
+        Ascending row ids where column `key` ("track" or "cls") equals `value`.
+        """
+        chunks = list(self._row_chunks(key, value))
+        return np.concatenate(chunks) if chunks else np.empty(0, dtype=np.int64)
+
+    def _row_chunks(self, key, value, lo=0, hi=None):
+        """
+        Yield the ascending row ids in [lo, hi) where column `key` equals `value`, at most
+        QUERY_CHUNK_ROWS at a time: slices of the memory-mapped postings, then the unindexed tail.
+        """
+        hi = self.meta["length"] if hi is None else hi
+        indexed = 0
+        postings = self._postings(key)
+        if postings is not None:
+            all_rows, keys, starts = postings
+            indexed = self.meta["indexed"]
+            i = np.searchsorted(keys, value)
+            if i < len(keys) and keys[i] == value:
+                end = starts[i + 1] if i + 1 < len(starts) else len(all_rows)
+                posting = all_rows[starts[i]:end]
+                a = int(np.searchsorted(posting, lo))
+                b = int(np.searchsorted(posting, min(hi, indexed)))
+                for start in range(a, b, QUERY_CHUNK_ROWS):
+                    yield np.asarray(posting[start:min(start + QUERY_CHUNK_ROWS, b)])
+        column = self.column(key)
+        for start in range(max(lo, indexed), hi, QUERY_CHUNK_ROWS):
+            tail = np.asarray(column[start:min(start + QUERY_CHUNK_ROWS, hi)])
+            matches = np.nonzero(tail == value)[0]
+            if len(matches):
+                yield matches + start
+
+    def frame_rows(self, start_frame=None, end_frame=None):
+        """
+        Row range [lo, hi) covering frames start_frame..end_frame inclusive (binary search).
+        """
+        frames = self.column("frame")
+        lo = 0 if start_frame is None else int(np.searchsorted(frames, start_frame, side="left"))
+        hi = len(frames) if end_frame is None else int(np.searchsorted(frames, end_frame, side="right"))
+        return lo, hi
+
+    def count(self, label, start_frame=None, end_frame=None, distinct_tracks=True):
+        """
+        Number of tracks (or detection rows) of class `label` between two frames.
+        """
+        if label not in self._class_ids:
+            return 0
+        lo, hi = self.frame_rows(start_frame, end_frame)
+        chunks = self._row_chunks("cls", self._class_ids[label], lo, hi)
+        if not distinct_tracks:
+            return int(sum(len(rows) for rows in chunks))
+        track_column = self.column("track")
+        tracks = np.empty(0, dtype=COLUMNS["track"])
+        for rows in chunks:
+            tracks = np.union1d(tracks, track_column[rows])
+        return int(len(tracks))
+
+    def counts_by_class(self, start_frame=None, end_frame=None):
+        """
+        Distinct tracks per class between two frames; each track is counted once, under the
+        label it was matched to most often.
+        Returns:
+            dict: {class: count}
+        """
+        lo, hi = self.frame_rows(start_frame, end_frame)
+        n_classes = len(self.meta["classes"])
+        track_column = self.column("track")
+        # Walk each class's postings in chunks, gathering only those rows' track ids, and keep
+        # (track, class) -> hits pairs, so memory is bounded by the chunk and the distinct pairs
+        keys = np.empty(0, dtype=np.int64)
+        hits = np.empty(0, dtype=np.int64)
+        for class_id in range(n_classes):
+            for rows in self._row_chunks("cls", class_id, lo, hi):
+                tracks, chunk_hits = np.unique(track_column[rows], return_counts=True)
+                merged, inverse = np.unique(np.concatenate([keys, tracks.astype(np.int64) * n_classes + class_id]),
+                                            return_inverse=True)
+                hits = np.bincount(inverse, weights=np.concatenate([hits, chunk_hits]), minlength=len(merged))
+                keys = merged
+        if len(keys) == 0:
+            return {}
+        key_tracks, key_classes = keys // n_classes, keys % n_classes
+        order = np.lexsort((-hits, key_tracks))
+        sorted_tracks = key_tracks[order]
+        first = np.r_[True, sorted_tracks[1:] != sorted_tracks[:-1]]
+        per_class = np.bincount(key_classes[order][first], minlength=n_classes)
+        return {self.meta["classes"][i]: int(c) for i, c in enumerate(per_class) if c}
+
+    def trajectory(self, track_id):
+        """
+        Returns:
+            dict: Column arrays (frame, x1, y1, x2, y2, conf, cls) for one track, in frame order.
+        """
+        rows = self.rows_for("track", track_id)
+        return {name: np.asarray(self.column(name)[rows])
+                for name in ("frame", "x1", "y1", "x2", "y2", "conf", "cls")}
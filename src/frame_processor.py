@@ -0,0 +1,224 @@
+import csv
+import datetime
+import time
+import cv2
+import numpy as np
+from src.sort import Sort, iou_batch
+from src.metrics import PipelineMetrics, clock
+
+vehicle_classes = ['car', 'motorcycle', 'bus', 'person', 'bike']
+
+CONF_THRESHOLD = 0.2
+CSV_HEADER = ["timestamp", "frame_id", "track_id", "class", "confidence", "x1", "y1", "x2", "y2"]
+
+
+class FrameProcessor:
+    """
+    Everything detect_video does after the model call: detection filtering, SORT tracking,
+    class matching, line and lane counting, signal control, logging, publishing and drawing.
+
+    It only sees arrays, never the model, so it can be driven by recorded or synthetic
+    detections (see src/replay_bench.py). All state is in source (full-frame) coordinates;
+    drawing maps it onto the decoded image with image = (source - origin) * scale.
+    """
+
+    def __init__(self, roi_source, roi_box=None, origin=(0, 0), scale=1.0, lane_counter=None,
+                 csv_writer=None, store=None, feed=None, metrics=None, annotate=True,
+                 classes=vehicle_classes, conf_threshold=CONF_THRESHOLD, signal_controller=None,
+                 aggregator=None, camera=None):
+        self.roi_x0, self.roi_y0, self.roi_x1, self.roi_y1 = roi_source
+        self.box_x0, self.box_y0 = (roi_box or roi_source)[:2]
+        self.origin_x, self.origin_y = origin
+        self.scale = scale
+        self.lane_counter = lane_counter
+        self.csv_writer = csv_writer
+        self.store = store
+        self.feed = feed
+        self.signal_controller = signal_controller
+        self.aggregator = aggregator
+        self.camera = camera
+        self.metrics = metrics if metrics is not None else PipelineMetrics()
+        self.annotate = annotate
+        self.classes = set(classes)
+        self.conf_threshold = conf_threshold
+
+        self.tracker = Sort()
+        self.counting_line_y = int(self.roi_y0 + (self.roi_y1 - self.roi_y0) * 0.5)
+        self.cumulative_counts = {}
+        self.cumulative_total = 0
+        self.counted_ids = set()
+        self.track_last_positions = {}
+        self.tracked_objects = np.empty((0, 5))
+        self.track_labels = []
+
+    def filter_detections(self, boxes_np, confs_np, clss_np, names):
+        """
+        Keep vehicle classes above the confidence threshold and map them to source coordinates.
+        Args:
+            boxes_np: (N, 4) xyxy boxes in ROI-image pixels, as returned by the model.
+            confs_np, clss_np: (N,) confidences and class ids.
+            names: Class id -> label mapping.
+        Returns:
+            list: [[x1, y1, x2, y2, conf, label], ...]
+        """
+        detections = []
+        for i in range(len(boxes_np)):
+            label = names[int(clss_np[i])]
+            conf = confs_np[i]
+            if label in self.classes and conf > self.conf_threshold:
+                xmin = (boxes_np[i][0] + self.box_x0) / self.scale + self.origin_x
+                ymin = (boxes_np[i][1] + self.box_y0) / self.scale + self.origin_y
+                xmax = (boxes_np[i][2] + self.box_x0) / self.scale + self.origin_x
+                ymax = (boxes_np[i][3] + self.box_y0) / self.scale + self.origin_y
+                detections.append([xmin, ymin, xmax, ymax, conf, label])
+        return detections
+
+    def _to_image(self, x, y):
+        return int((x - self.origin_x) * self.scale), int((y - self.origin_y) * self.scale)
+
+    def process(self, frame_id, frame, detections, dt=1, scene_time=None, captured_at=None):
+        """
+        Track, count, log and draw one frame.
+        Args:
+            frame_id: Frame number.
+            frame: Decoded image (only used for drawing).
+            detections: Output of filter_detections.
+            dt: Frames elapsed since the previous processed frame.
+            scene_time: Seconds into the video / stream, for signal queue wait times.
+            captured_at: clock() time the frame was read, for frame-to-decision latency.
+        Returns:
+            np.ndarray: The annotated frame, or None when annotate is False.
+        """
+        metrics = self.metrics
+        t = clock()
+        dets = np.array([d[:5] for d in detections], dtype=float).reshape(-1, 5)
+        tracked_objects = self.tracker.update(dets, dt=dt)
+        t = metrics.lap("track", t)
+
+        # Class assignment: best-IoU detection for every track at once
+        n_tracks = len(tracked_objects)
+        match_idx = np.full(n_tracks, -1)
+        if n_tracks and len(detections):
+            with np.errstate(divide="ignore", invalid="ignore"):
+                iou = iou_batch(tracked_objects[:, :4], dets[:, :4])
+            best = iou.argmax(axis=1)
+            best_iou = iou[np.arange(n_tracks), best]
+            match_idx = np.where(best_iou > 0, best, -1)
+        track_labels = [detections[m][5] if m >= 0 else None for m in match_idx]
+        track_confs = [detections[m][4] if m >= 0 else 0.0 for m in match_idx]
+        t = metrics.lap("match", t)
+
+        # Count only when the centre crosses the line (downwards)
+        crossings = []
+        line_y = self.counting_line_y
+        last_positions = self.track_last_positions
+        current_positions = {}
+        for n, track in enumerate(tracked_objects):
+            track_id = int(track[4])
+            cy = int((track[1] + track[3]) / 2)
+            current_positions[track_id] = cy
+            prev_cy = last_positions.get(track_id)
+            if prev_cy is not None and prev_cy < line_y <= cy and track_id not in self.counted_ids:
+                self.counted_ids.add(track_id)
+                label = track_labels[n]
+                if label is not None:
+                    self.cumulative_counts[label] = self.cumulative_counts.get(label, 0) + 1
+                    self.cumulative_total += 1
+                    crossings.append({"track_id": track_id, "label": label, "lane": None})
+        self.track_last_positions = current_positions
+        t = metrics.lap("count", t)
+
+        if self.csv_writer and n_tracks:
+            timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            self.csv_writer.writerows([
+                timestamp, frame_id, int(track[4]),
+                track_labels[n] if track_labels[n] is not None else "unknown",
+                round(float(track_confs[n]), 2),
+                int(track[0]), int(track[1]), int(track[2]), int(track[3])
+            ] for n, track in enumerate(tracked_objects))
+            t = metrics.lap("log", t)
+        if self.store is not None:
+            self.store.append_many(frame_id, tracked_objects, track_labels, track_confs)
+            t = metrics.lap("store", t)
+
+        # Per-lane counting: all tracks against all lanes in one vectorized test
+        if self.lane_counter is not None:
+            centers = (tracked_objects[:, 0:2] + tracked_objects[:, 2:4]) / 2
+            lane_events = self.lane_counter.update(tracked_objects[:, 4], centers, track_labels)
+            crossings.extend({"track_id": tid, "label": label, "lane": lane_id}
+                             for tid, lane_id, label in lane_events)
+            t = metrics.lap("lanes", t)
+
+        # Windowed counts and rollups: lane crossings when lanes are configured, else line crossings
+        if self.aggregator is not None and crossings:
+            now = time.time()
+            for crossing in crossings:
+                if self.lane_counter is None or crossing["lane"] is not None:
+                    self.aggregator.add_event(now, crossing["label"], lane=crossing["lane"], camera=self.camera)
+            t = metrics.lap("aggregate", t)
+
+        # Closed loop: lane queues -> decide_green_lane on every frame
+        decision = None
+        if self.signal_controller is not None:
+            decision = self.signal_controller.update(tracked_objects, track_labels, now=scene_time,
+                                                     captured_at=captured_at)
+            t = metrics.lap("signal", t)
+
+        # Push new crossings and signal changes to the live feed (coalesced by the feed itself)
+        if self.feed is not None and (crossings or (decision is not None and decision["switched"])):
+            lane_counts = self.lane_counter.lane_counts if self.lane_counter is not None else None
+            signal = self.signal_controller.summary() if decision is not None else None
+            self.feed.publish(counts=self.cumulative_counts, crossings=crossings, frame_id=frame_id,
+                              lanes=lane_counts, signal=signal)
+            t = metrics.lap("publish", t)
+
+        self.tracked_objects = tracked_objects
+        self.track_labels = track_labels
+        metrics.incr("detections", len(detections))
+        metrics.set_gauge("active_tracks", len(self.tracker.trackers))
+
+        if not self.annotate:
+            return None
+        annotated_frame = self.draw(frame, tracked_objects, track_labels, track_confs)
+        metrics.lap("draw", t)
+        return annotated_frame
+
+    def draw(self, frame, tracked_objects, track_labels, track_confs):
+        annotated_frame = frame.copy()
+        line_y_img = self._to_image(0, self.counting_line_y)[1]
+        cv2.line(annotated_frame, (self._to_image(self.roi_x0, 0)[0], line_y_img),
+                 (self._to_image(self.roi_x1, 0)[0], line_y_img), (0,0,255), 2)
+
+        for n, (x1, y1, x2, y2, track_id) in enumerate(tracked_objects):
+            box_label = f"ID:{int(track_id)}"
+            if track_labels[n] is not None:
+                box_label += f" {track_labels[n]} {track_confs[n]:.2f}"
+            ix1, iy1 = self._to_image(x1, y1)
+            ix2, iy2 = self._to_image(x2, y2)
+            cv2.rectangle(annotated_frame, (ix1, iy1), (ix2, iy2), (0, 255, 0), 2)
+            cv2.putText(annotated_frame, box_label, (ix1, iy1-5),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0,255,0), 2)
+
+        if self.lane_counter is not None:
+            self.lane_counter.draw(annotated_frame, origin=(self.origin_x, self.origin_y), scale=self.scale)
+
+        # Display cumulative counts
+        y_disp = 30
+        for label, count in self.cumulative_counts.items():
+            cv2.putText(annotated_frame, f"{label}: {count}", (10, y_disp),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0,255,0), 2)
+            y_disp += 30
+        cv2.putText(annotated_frame, f"Total: {self.cumulative_total}", (10, y_disp+10),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.8, (255,0,0), 2)
+        return annotated_frame
+
+
+def open_csv_log(log_csv_path):
+    """
+    Returns:
+        tuple: (file, csv.writer) with the detection-log header written.
+    """
+    csv_file = open(log_csv_path, mode="w", newline="")
+    csv_writer = csv.writer(csv_file)
+    csv_writer.writerow(CSV_HEADER)
+    return csv_file, csv_writer
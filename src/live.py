@@ -0,0 +1,146 @@
+import argparse
+import json
+import threading
+import time
+from src.metrics import clock
+
+
+class LatestFrameGrabber:
+    """
+    Reads a frame source on a background thread and keeps only the newest frame.
+
+    When the consumer falls behind, older frames are overwritten instead of queued, so
+    latency stays bounded; every overwritten frame is counted in `dropped`. With realtime=True
+    a file source is replayed at its native frame rate, which simulates a live camera
+    (e.g. data/traffic1.mp4 at 25 fps).
+    """
+
+    def __init__(self, source, realtime=False):
+        self.source = source
+        self.realtime = realtime
+        self.dropped = 0
+        self.captured = 0
+        self._latest = None          # (frame_id, image, capture_time)
+        self._done = False
+        self._stopped = False
+        self._release_on_exit = False
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        fps = getattr(self.source, "fps", 0) or 25.0
+        reused_buffer = getattr(self.source, "buffer", None)
+        start_time = None
+        first_id = None
+        try:
+            while not self._stopped:
+                item = self.source.read()
+                if item is None:
+                    break
+                frame_id, image = item
+                if self.realtime:
+                    if start_time is None:
+                        start_time, first_id = clock(), frame_id
+                    delay = start_time + (frame_id - first_id) / fps - clock()
+                    if delay > 0:
+                        time.sleep(delay)
+                if image is reused_buffer:
+                    image = image.copy()  # ffmpeg source overwrites its buffer on the next read
+                with self._cond:
+                    if self._latest is not None:
+                        self.dropped += 1
+                    self._latest = (frame_id, image, clock())
+                    self.captured += 1
+                    self._cond.notify()
+        finally:
+            # Always signal the consumer, even if the source raised
+            with self._cond:
+                self._done = True
+                release = self._release_on_exit
+                self._cond.notify()
+            if release:
+                self.source.release()
+
+    def pending(self):
+        """
+        Number of frames waiting for the consumer (0 or 1).
+        """
+        return 0 if self._latest is None else 1
+
+    def read(self):
+        """
+        Block until a frame newer than the last one read is available.
+        Returns:
+            tuple: (frame_id, image, capture_time), or None once the source is exhausted.
+        """
+        with self._cond:
+            while self._latest is None and not self._done:
+                self._cond.wait()
+            item, self._latest = self._latest, None
+            return item
+
+    def stop(self, release=False):
+        """
+        Stop reading. With release=True the source is also released, but never while the reader
+        thread may still be inside source.read() (e.g. a stalled stream): in that case the thread
+        releases it when the read returns.
+        """
+        self._stopped = True
+        self._thread.join(timeout=1.0)
+        if not release:
+            return
+        with self._cond:
+            if not self._done:
+                self._release_on_exit = True
+                return
+        self.source.release()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run detect_video in latency-bounded live mode")
+    parser.add_argument("source", help="Video file, stream URL or camera index")
+    parser.add_argument("--budget-ms", type=float, default=200.0,
+                        help="Drop frames older than this when they reach the detector")
+    parser.add_argument("--no-realtime", action="store_true",
+                        help="Read files as fast as possible instead of at their native frame rate")
+    parser.add_argument("--show", action="store_true", help="Show the annotated frames")
+    parser.add_argument("--feed-port", type=int, default=None,
+                        help="Publish live counts as Server-Sent Events on this port")
+    parser.add_argument("--feed-rate", type=float, default=4.0, help="Max feed events per second")
+    parser.add_argument("--signal-lanes", default=None,
+                        help="Lane config JSON: run decide_green_lane on the live lane queues every frame")
+    args = parser.parse_args()
+
+    from src.detect_video import detect_video
+    from src.metrics import PipelineMetrics
+    from src.live_feed import CountFeed
+    from Logic.controller import SignalController
+    from Logic.aggregator import TrafficAggregator
+
+    source = int(args.source) if args.source.isdigit() else args.source
+    metrics = PipelineMetrics(video=str(args.source))
+    feed = None
+    if args.feed_port:
+        feed = CountFeed(port=args.feed_port, rate_hz=args.feed_rate, video=str(args.source))
+        print(f"[Feed] Serving http://127.0.0.1:{args.feed_port}/events")
+    aggregator = TrafficAggregator()
+    signal = None
+    if args.signal_lanes:
+        signal = SignalController(args.signal_lanes, metrics=metrics, silent=False)
+    try:
+        counts = detect_video(source, show_window=args.show, live=True, latency_budget_ms=args.budget_ms,
+                              realtime=not args.no_realtime, metrics=metrics, feed=feed,
+                              signal=signal, aggregator=aggregator)
+    finally:
+        if feed is not None:
+            feed.close()
+    report = metrics.report()
+    print(json.dumps({"counts": counts, "last_minute": aggregator.sliding_counts(),
+                      "per_minute": aggregator.rollup("minute"), "fps": report["fps"],
+                      "counters": report["counters"], "gauges": report["gauges"],
+                      "signal": signal.summary() if signal else None}, indent=4))
+
+
+if __name__ == "__main__":
+    main()
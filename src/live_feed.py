@@ -0,0 +1,152 @@
+import json
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_FEED_PORT = 8765
+DEFAULT_RATE_HZ = 4.0        # max events per second sent to clients
+KEEPALIVE_SECONDS = 15.0
+MAX_CROSSINGS_PER_EVENT = 200
+EVENT_BACKLOG = 64           # recent events kept so a slow client receives every crossing
+
+
+class CountFeed:
+    """
+    Publishes live count and crossing updates as Server-Sent Events.
+
+    publish() is cheap and never blocks on the network: it merges the update into pending state.
+    A background thread coalesces pending state into at most rate_hz events per second, which
+    every connected client receives from GET /events. Each client is sent every event it has not
+    seen yet, from a shared backlog of the last EVENT_BACKLOG events, so a slow client gets
+    late crossings instead of losing them; a reconnecting client resumes from its Last-Event-ID.
+    GET /snapshot returns the latest state as JSON.
+
+    Event data:
+        {"seq": 12, "ts": 1700000000.0, "video": "traffic1.mp4", "frame_id": 250,
+         "counts": {"car": 5}, "total": 5, "lanes": {"1": {"car": 3}},
+         "crossings": [{"track_id": 7, "label": "car", "lane": 1}],
+         "signal": {"green_lane": 1, "duration": 12.5, "queues": {"1": 4, "2": 9}, "waits": {"1": 0.0, "2": 31.2}}}
+    """
+
+    def __init__(self, port=DEFAULT_FEED_PORT, host="127.0.0.1", rate_hz=DEFAULT_RATE_HZ, video=None):
+        self.interval = 1.0 / rate_hz
+        self._cond = threading.Condition()
+        self._state = {"video": video, "frame_id": None, "counts": {}, "total": 0, "lanes": {},
+                       "signal": None}
+        self._pending_crossings = []
+        self._dirty = False
+        self._seq = 0
+        self._events = deque(maxlen=EVENT_BACKLOG)   # recent encoded events (seq, bytes)
+        self._closed = False
+
+        feed = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                path = self.path.split("?")[0].rstrip("/")
+                if path == "/events":
+                    feed._stream(self)
+                elif path == "/snapshot":
+                    body = json.dumps(feed.snapshot()).encode()
+                    self.send_response(200)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(body)))
+                    self.send_header("Access-Control-Allow-Origin", "*")
+                    self.end_headers()
+                    self.wfile.write(body)
+                else:
+                    self.send_error(404)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        threading.Thread(target=self._coalesce, daemon=True).start()
+
+    def publish(self, counts=None, lanes=None, crossings=(), frame_id=None, signal=None):
+        """
+        Merge an update into the pending state. counts / lanes / signal replace the previous values.
+        """
+        with self._cond:
+            if counts is not None:
+                self._state["counts"] = dict(counts)
+                self._state["total"] = sum(counts.values())
+            if lanes is not None:
+                self._state["lanes"] = {str(k): dict(v) for k, v in lanes.items()}
+            if frame_id is not None:
+                self._state["frame_id"] = frame_id
+            if signal is not None:
+                self._state["signal"] = signal
+            self._pending_crossings.extend(crossings)
+            del self._pending_crossings[:-MAX_CROSSINGS_PER_EVENT]
+            self._dirty = True
+
+    def snapshot(self):
+        with self._cond:
+            return dict(self._state, seq=self._seq)
+
+    def _coalesce(self):
+        while not self._closed:
+            time.sleep(self.interval)
+            self._emit()
+
+    def _emit(self):
+        with self._cond:
+            if not self._dirty:
+                return
+            self._seq += 1
+            event = dict(self._state, seq=self._seq, ts=time.time(), crossings=self._pending_crossings)
+            self._pending_crossings = []
+            self._dirty = False
+            data = json.dumps(event)
+            self._events.append((self._seq, f"id: {self._seq}\nevent: counts\ndata: {data}\n\n".encode()))
+            self._cond.notify_all()
+
+    def _stream(self, handler):
+        handler.send_response(200)
+        handler.send_header("Content-Type", "text/event-stream")
+        handler.send_header("Cache-Control", "no-cache")
+        handler.send_header("Connection", "keep-alive")
+        handler.send_header("Access-Control-Allow-Origin", "*")
+        handler.end_headers()
+        # New clients start from the latest event; reconnecting ones resume where they left off
+        resume = handler.headers.get("Last-Event-ID")
+        last_seq = int(resume) if resume and resume.isdigit() else None
+        if last_seq is not None and last_seq > self._seq:
+            last_seq = None  # id from before this feed restarted
+        try:
+            while not self._closed:
+                with self._cond:
+                    if not self._events or self._events[-1][0] == last_seq:
+                        self._cond.wait(KEEPALIVE_SECONDS)
+                    if last_seq is None:
+                        pending = list(self._events)[-1:]
+                    else:
+                        pending = [event for event in self._events if event[0] > last_seq]
+                if not pending:
+                    handler.wfile.write(b": keepalive\n\n")
+                else:
+                    last_seq = pending[-1][0]
+                    handler.wfile.write(b"".join(event[1] for event in pending))
+                handler.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # client went away
+        handler.close_connection = True
+
+    def close(self, linger=None):
+        """
+        Emit any pending update, give clients `linger` seconds (default: one interval) to
+        receive it, then stop the server.
+        """
+        self._emit()
+        time.sleep(self.interval if linger is None else linger)
+        self._closed = True
+        with self._cond:
+            self._cond.notify_all()
+        self.server.shutdown()
+        self.server.server_close()
@@ -0,0 +1,206 @@
+import glob
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+clock = time.perf_counter
+
+METRIC_PREFIX = "trafficeye"
+
+
+class PipelineMetrics:
+    """
+    Low-overhead per-stage timers, counters and gauges for one detect_video run.
+
+    Stages are timed with lap(), which costs one perf_counter call per stage:
+        t = clock()
+        frame = read()
+        t = metrics.lap("decode", t)
+        results = model(frame)
+        t = metrics.lap("inference", t)
+    """
+
+    def __init__(self, video=None):
+        self.video = video
+        self.stage_seconds = {}
+        self.stage_calls = {}
+        self.stage_max = {}
+        self.counters = {}
+        self.gauges = {}
+        self.started = clock()
+        self.finished = None
+
+    def add(self, stage, seconds, calls=1):
+        self.stage_seconds[stage] = self.stage_seconds.get(stage, 0.0) + seconds
+        self.stage_calls[stage] = self.stage_calls.get(stage, 0) + calls
+        if seconds > self.stage_max.get(stage, 0.0):
+            self.stage_max[stage] = seconds
+
+    def lap(self, stage, start, calls=1):
+        """
+        Record the time since `start` against `stage` and return the new start time.
+        Use calls=0 when a stage is timed in several pieces per frame.
+        """
+        now = clock()
+        self.add(stage, now - start, calls)
+        return now
+
+    def incr(self, name, n=1):
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def set_gauge(self, name, value):
+        self.gauges[name] = value
+
+    def finish(self):
+        self.finished = clock()
+
+    def report(self):
+        """
+        Returns:
+            dict: JSON-serializable summary (times in milliseconds).
+        """
+        wall = (self.finished or clock()) - self.started
+        frames = self.counters.get("frames", 0)
+        busy = sum(self.stage_seconds.values())
+        stages = {}
+        for stage, seconds in self.stage_seconds.items():
+            calls = self.stage_calls[stage]
+            stages[stage] = {
+                "total_ms": round(seconds * 1000, 3),
+                "calls": calls,
+                "mean_ms": round(seconds * 1000 / calls, 3) if calls else 0.0,
+                "max_ms": round(self.stage_max.get(stage, 0.0) * 1000, 3),
+                "per_frame_ms": round(seconds * 1000 / frames, 3) if frames else 0.0,
+                "share": round(seconds / busy, 4) if busy else 0.0,
+            }
+        return {
+            "video": self.video,
+            "pid": os.getpid(),
+            "wall_s": round(wall, 3),
+            "fps": round(frames / wall, 2) if wall > 0 else 0.0,
+            "stages": stages,
+            "counters": dict(self.counters),
+            "gauges": dict(self.gauges),
+        }
+
+    def write_json(self, path):
+        """
+        Write the report atomically, so readers never see a partial file.
+        """
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.report(), f, indent=4)
+        os.replace(tmp_path, path)
+
+
+def load_reports(metrics_dir):
+    """
+    Load every per-video JSON report in a directory.
+    """
+    reports = []
+    for path in sorted(glob.glob(os.path.join(metrics_dir, "*.json"))):
+        try:
+            with open(path) as f:
+                reports.append(json.load(f))
+        except (OSError, ValueError):
+            continue  # report being rewritten
+    return reports
+
+
+def merge_reports(reports):
+    """
+    Combine per-video reports into one summary: stage times and counters are summed,
+    fps is the sum over workers (aggregate throughput).
+    """
+    merged = {"videos": len(reports), "fps": 0.0, "stages": {}, "counters": {}}
+    for report in reports:
+        merged["fps"] += report.get("fps", 0.0)
+        for stage, s in report.get("stages", {}).items():
+            m = merged["stages"].setdefault(stage, {"total_ms": 0.0, "calls": 0, "max_ms": 0.0})
+            m["total_ms"] += s["total_ms"]
+            m["calls"] += s["calls"]
+            m["max_ms"] = max(m["max_ms"], s["max_ms"])
+        for name, value in report.get("counters", {}).items():
+            merged["counters"][name] = merged["counters"].get(name, 0) + value
+    frames = merged["counters"].get("frames", 0)
+    for s in merged["stages"].values():
+        s["mean_ms"] = round(s["total_ms"] / s["calls"], 3) if s["calls"] else 0.0
+        s["per_frame_ms"] = round(s["total_ms"] / frames, 3) if frames else 0.0
+    merged["fps"] = round(merged["fps"], 2)
+    return merged
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def reports_to_prometheus(reports, extra_gauges=None):
+    """
+    Render reports in the Prometheus text exposition format, one label set per video.
+    """
+    families = {}
+
+    def add(name, kind, help_text, labels, value):
+        family = families.setdefault(name, (kind, help_text, []))
+        label_text = ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items())
+        family[2].append(f"{name}{{{label_text}}} {value}" if label_text else f"{name} {value}")
+
+    for report in reports:
+        base = {"video": report.get("video") or "", "pid": report.get("pid", "")}
+        for stage, s in report.get("stages", {}).items():
+            labels = dict(base, stage=stage)
+            add(f"{METRIC_PREFIX}_stage_seconds_total", "counter",
+                "Time spent in each pipeline stage.", labels, s["total_ms"] / 1000)
+            add(f"{METRIC_PREFIX}_stage_calls_total", "counter",
+                "Number of timed calls per pipeline stage.", labels, s["calls"])
+            add(f"{METRIC_PREFIX}_stage_max_seconds", "gauge",
+                "Slowest single call per pipeline stage.", labels, s["max_ms"] / 1000)
+        for name, value in report.get("counters", {}).items():
+            add(f"{METRIC_PREFIX}_{name}_total", "counter", f"Counter {name}.", base, value)
+        for name, value in report.get("gauges", {}).items():
+            add(f"{METRIC_PREFIX}_{name}", "gauge", f"Gauge {name}.", base, value)
+        add(f"{METRIC_PREFIX}_fps", "gauge", "Processed frames per second.", base, report.get("fps", 0.0))
+    for name, value in (extra_gauges or {}).items():
+        add(f"{METRIC_PREFIX}_{name}", "gauge", f"Gauge {name}.", {}, value)
+
+    lines = []
+    for name, (kind, help_text, samples) in families.items():
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        lines.extend(samples)
+    return "\n".join(lines) + "\n"
+
+
+def write_prometheus(reports, path, extra_gauges=None):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        f.write(reports_to_prometheus(reports, extra_gauges))
+    os.replace(tmp_path, path)
+
+
+def serve_prometheus(render, port=9108, host="127.0.0.1"):
+    """
+    Serve `render()` (a function returning Prometheus text) at /metrics from a daemon thread.
+    Returns:
+        ThreadingHTTPServer: call shutdown() to stop it.
+    """
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.rstrip("/") != "/metrics":
+                self.send_error(404)
+                return
+            body = render().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
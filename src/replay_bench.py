@@ -0,0 +1,182 @@
+"""
+Detector-free benchmark of the detect_video post-inference path.
+
+Replays synthetic (or recorded) detections through FrameProcessor, i.e. filtering, Sort,
+class matching, line/lane counting, signal decisions and CSV logging, and reports the per-frame overhead at
+several object densities. Exits non-zero when the overhead exceeds --max-ms or regresses past
+a saved baseline, so it can gate changes in CI. Runs in seconds on a CPU, no model needed.
+
+    python -m src.replay_bench --densities 5 20 50 --save-baseline data/replay_baseline.json
+    python -m src.replay_bench --baseline data/replay_baseline.json --tolerance 0.25
+"""
+import argparse
+import csv
+import io
+import json
+import statistics
+import sys
+import numpy as np
+from src.frame_processor import FrameProcessor, vehicle_classes
+from src.metrics import PipelineMetrics, clock
+from src.zones import LaneCounter
+from Logic.controller import SignalController
+
+# Source frame size and ROI of the bundled videos (768x432, default ROI)
+FRAME_SIZE = (768, 432)
+ROI_SOURCE = (384, 172, 768, 344)
+NAMES = dict(enumerate(vehicle_classes))
+
+DEFAULT_DENSITIES = (5, 20, 50)
+DEFAULT_FRAMES = 300
+DEFAULT_MAX_MS = 20.0
+DEFAULT_TOLERANCE = 0.25
+WARMUP_FRAMES = 20
+
+
+def synthetic_detections(n_objects, n_frames, roi=ROI_SOURCE, seed=0):
+    """
+    Objects drifting down through the ROI at random speeds, re-entering at the top, with box
+    jitter, confidence noise and occasional missed detections.
+    Yields:
+        tuple: (boxes_np (N, 4) in ROI pixels, confs_np (N,), clss_np (N,))
+    """
+    rng = np.random.default_rng(seed)
+    roi_w, roi_h = roi[2] - roi[0], roi[3] - roi[1]
+    sizes = rng.uniform(12, 40, size=(n_objects, 2))
+    x = rng.uniform(0, roi_w - sizes[:, 0])
+    y = rng.uniform(-roi_h, roi_h, size=n_objects)
+    speed = rng.uniform(1.0, 4.0, size=n_objects)
+    classes = rng.integers(0, len(vehicle_classes), size=n_objects)
+    for _ in range(n_frames):
+        y += speed
+        wrapped = y > roi_h
+        y[wrapped] -= roi_h + sizes[wrapped, 1]
+        jitter = rng.normal(0, 0.5, size=(n_objects, 2))
+        boxes = np.stack([x + jitter[:, 0], y + jitter[:, 1],
+                          x + sizes[:, 0] + jitter[:, 0], y + sizes[:, 1] + jitter[:, 1]], axis=1)
+        visible = (boxes[:, 3] > 0) & (boxes[:, 1] < roi_h) & (rng.random(n_objects) > 0.05)
+        confs = rng.uniform(0.3, 0.95, size=n_objects)
+        yield boxes[visible], confs[visible], classes[visible]
+
+
+def recorded_detections(csv_path, roi=ROI_SOURCE):
+    """
+    Replay a detection log written by detect_video (log_csv_path), converted back to ROI pixels.
+    """
+    label_ids = {label: i for i, label in NAMES.items()}
+    frames = {}
+    with open(csv_path, newline="") as f:
+        for row in csv.DictReader(f):
+            if row["class"] not in label_ids:
+                continue
+            box = [float(row["x1"]) - roi[0], float(row["y1"]) - roi[1],
+                   float(row["x2"]) - roi[0], float(row["y2"]) - roi[1]]
+            frames.setdefault(int(row["frame_id"]), []).append(
+                (box, float(row["confidence"]), label_ids[row["class"]]))
+    for frame_id in sorted(frames):
+        rows = frames[frame_id]
+        yield (np.array([r[0] for r in rows]), np.array([r[1] for r in rows]),
+               np.array([r[2] for r in rows]))
+
+
+def run_replay(frames, lanes=None, annotate=False, signal=False, fps=25.0):
+    """
+    Time FrameProcessor over a detection stream.
+    Returns:
+        dict: Per-frame overhead statistics in milliseconds, plus the stage breakdown.
+    """
+    metrics = PipelineMetrics(video="replay")
+    csv_writer = csv.writer(io.StringIO())
+    lane_counter = LaneCounter(lanes) if lanes else None
+    signal_controller = SignalController(lanes, metrics=metrics) if lanes and signal else None
+    processor = FrameProcessor(ROI_SOURCE, lane_counter=lane_counter, csv_writer=csv_writer,
+                               metrics=metrics, annotate=annotate, signal_controller=signal_controller)
+    blank = np.zeros((FRAME_SIZE[1], FRAME_SIZE[0], 3), dtype=np.uint8)
+    times = []
+    detections_seen = 0
+    for frame_id, (boxes, confs, clss) in enumerate(frames, start=1):
+        t = clock()
+        detections = processor.filter_detections(boxes, confs, clss, NAMES)
+        processor.process(frame_id, blank, detections, scene_time=frame_id / fps, captured_at=t)
+        elapsed = clock() - t
+        if frame_id > WARMUP_FRAMES:
+            times.append(elapsed * 1000)
+            detections_seen += len(detections)
+    times.sort()
+    report = metrics.report()
+    return {
+        "frames": len(times),
+        "mean_detections": round(detections_seen / len(times), 2) if times else 0.0,
+        "mean_ms": round(statistics.fmean(times), 4) if times else 0.0,
+        "p50_ms": round(times[len(times) // 2], 4) if times else 0.0,
+        "p95_ms": round(times[int(len(times) * 0.95)], 4) if times else 0.0,
+        "stages_ms_per_frame": {stage: s["per_frame_ms"] for stage, s in report["stages"].items()},
+    }
+
+
+def check(results, max_ms, baseline=None, tolerance=DEFAULT_TOLERANCE):
+    """
+    Returns:
+        list: Failure messages, empty when every density is within budget.
+    """
+    failures = []
+    for density, result in results.items():
+        if result["mean_ms"] > max_ms:
+            failures.append(f"density {density}: {result['mean_ms']:.3f} ms/frame exceeds {max_ms} ms")
+        if baseline and density in baseline:
+            limit = baseline[density]["mean_ms"] * (1 + tolerance)
+            if result["mean_ms"] > limit:
+                failures.append(f"density {density}: {result['mean_ms']:.3f} ms/frame regressed past "
+                                f"{limit:.3f} ms (baseline {baseline[density]['mean_ms']:.3f} ms + {tolerance:.0%})")
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the detect_video post-inference path without YOLO")
+    parser.add_argument("--densities", type=int, nargs="+", default=list(DEFAULT_DENSITIES),
+                        help="Objects per frame for synthetic replays")
+    parser.add_argument("--frames", type=int, default=DEFAULT_FRAMES, help="Frames per replay")
+    parser.add_argument("--recorded", help="Replay a detection CSV log instead of synthetic detections")
+    parser.add_argument("--lanes", help="Lane config JSON to include lane counting")
+    parser.add_argument("--annotate", action="store_true", help="Include drawing in the measurement")
+    parser.add_argument("--signal", action="store_true",
+                        help="Include the closed-loop signal decision (needs --lanes)")
+    parser.add_argument("--max-ms", type=float, default=DEFAULT_MAX_MS,
+                        help="Fail when mean overhead per frame exceeds this")
+    parser.add_argument("--baseline", help="JSON results to compare against")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="Allowed slowdown relative to the baseline (0.25 = 25%%)")
+    parser.add_argument("--save-baseline", help="Write the results here as a new baseline")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    results = {}
+    if args.recorded:
+        results["recorded"] = run_replay(recorded_detections(args.recorded), args.lanes, args.annotate,
+                                         args.signal)
+    else:
+        for density in args.densities:
+            frames = synthetic_detections(density, args.frames + WARMUP_FRAMES, seed=args.seed)
+            results[str(density)] = run_replay(frames, args.lanes, args.annotate, args.signal)
+
+    for density, result in results.items():
+        print(f"density {density:>8}: {result['mean_ms']:8.3f} ms/frame mean, {result['p95_ms']:8.3f} ms p95 "
+              f"({result['mean_detections']} detections/frame)")
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump(results, f, indent=4)
+        print(f"[Bench] Saved baseline to {args.save_baseline}")
+
+    failures = check(results, args.max_ms, baseline, args.tolerance)
+    for failure in failures:
+        print(f"FAIL {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,127 @@
+import os
+import time
+from multiprocessing import Pool, Value
+
+# Thread-pool sizes read by OpenMP / BLAS runtimes when they start
+THREAD_ENV_VARS = ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS",
+                   "NUMEXPR_NUM_THREADS", "VECLIB_MAXIMUM_THREADS")
+
+DEFAULT_CALIBRATION_FRAMES = 60
+
+
+def available_cores():
+    """
+    Cores this process may run on (respects container / taskset limits).
+    """
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def plan_workers(n_workers, cores=None):
+    """
+    Split the available cores into one contiguous, disjoint slot per worker.
+    Returns:
+        tuple: (threads_per_worker, [cores of worker 0, cores of worker 1, ...])
+    """
+    cores = available_cores() if cores is None else list(cores)
+    n_workers = max(1, min(n_workers, len(cores)))
+    threads = max(1, len(cores) // n_workers)
+    slots = [cores[i * threads:(i + 1) * threads] for i in range(n_workers)]
+    return threads, slots
+
+
+def candidate_splits(n_cores, max_workers=None):
+    """
+    Worker x thread splits that use at most n_cores, one per worker count.
+    Returns:
+        list: [(workers, threads_per_worker), ...]
+    """
+    max_workers = min(n_cores, max_workers or n_cores)
+    return [(w, max(1, n_cores // w)) for w in range(1, max_workers + 1)]
+
+
+def configure_worker(threads, cores=None):
+    """
+    Limit torch, OpenCV and BLAS thread pools in this process, and optionally pin it to `cores`.
+    Safe to call before or after the libraries are imported.
+    """
+    for var in THREAD_ENV_VARS:
+        os.environ[var] = str(threads)
+    try:
+        import cv2
+        cv2.setNumThreads(threads)
+    except ImportError:
+        pass
+    try:
+        import torch
+        torch.set_num_threads(threads)
+        try:
+            torch.set_num_interop_threads(1)
+        except RuntimeError:
+            pass  # can only be set before the first parallel op
+    except ImportError:
+        pass
+    try:
+        from threadpoolctl import threadpool_limits
+        threadpool_limits(threads)  # BLAS already loaded by NumPy
+    except ImportError:
+        pass
+    if cores and hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, cores)
+
+
+def _init_worker(threads, slots, counter):
+    """
+    Pool initializer: each new worker takes the next core slot.
+    """
+    with counter.get_lock():
+        index = counter.value
+        counter.value += 1
+    configure_worker(threads, slots[index % len(slots)] if slots else None)
+
+
+def make_pool(n_workers, threads=None, pin=False):
+    """
+    Create a Pool whose workers share the machine's cores instead of each using all of them.
+    Args:
+        n_workers: Number of worker processes.
+        threads: Intra-op threads per worker (defaults to cores // n_workers).
+        pin: Pin each worker to its own disjoint set of cores.
+    """
+    planned_threads, slots = plan_workers(n_workers)
+    threads = threads or planned_threads
+    counter = Value("i", 0)
+    return Pool(processes=n_workers, initializer=_init_worker,
+                initargs=(threads, slots if pin else None, counter))
+
+
+def _calibration_task(args):
+    clip_path, max_frames = args
+    from src.detect_video import detect_video, get_model
+    from src.metrics import PipelineMetrics
+    get_model()  # model load is not part of steady-state throughput
+    metrics = PipelineMetrics(video=os.path.basename(clip_path))
+    start = time.perf_counter()
+    detect_video(clip_path, max_frames=max_frames, metrics=metrics)
+    return metrics.counters.get("frames", 0), time.perf_counter() - start
+
+
+def calibrate(clip_path, max_frames=DEFAULT_CALIBRATION_FRAMES, max_workers=None, pin=False, splits=None):
+    """
+    Measure aggregate throughput of each worker x thread split on a short clip (every worker
+    processes the clip concurrently) and pick the fastest.
+    Returns:
+        tuple: ((workers, threads), {(workers, threads): frames_per_second})
+    """
+    splits = splits or candidate_splits(len(available_cores()), max_workers)
+    throughput = {}
+    for workers, threads in splits:
+        with make_pool(workers, threads, pin=pin) as pool:
+            runs = pool.map(_calibration_task, [(clip_path, max_frames)] * workers)
+        frames = sum(r[0] for r in runs)
+        elapsed = max(r[1] for r in runs)
+        throughput[(workers, threads)] = frames / elapsed if elapsed > 0 else 0.0
+        print(f"[Calibrate] {workers} workers x {threads} threads: {throughput[(workers, threads)]:.1f} fps")
+    best = max(throughput, key=throughput.get)
+    return best, throughput
@@ -19,11 +19,6 @@ from __future__ import print_function
 
 import os
 import numpy as np
-import matplotlib
-matplotlib.use('TkAgg')
-import matplotlib.pyplot as plt
-import matplotlib.patches as patches
-from skimage import io
 
 import glob
 import time
@@ -119,6 +114,7 @@ class KalmanBoxTracker(object):
     self.hits = 0
     self.hit_streak = 0
     self.age = 0
+    self.dt = 1
 
   def update(self,bbox):
     """
@@ -130,13 +126,20 @@ class KalmanBoxTracker(object):
     self.hit_streak += 1
     self.kf.update(convert_bbox_to_z(bbox))
 
-  def predict(self):
+  def predict(self, dt=1):
     """
-    Advances the state vector and returns the predicted bounding box estimate.
+    Advances the state vector by dt frames and returns the predicted bounding box estimate.
+    dt > 1 accounts for frames that were skipped or dropped since the last update.
     """
-    if((self.kf.x[6]+self.kf.x[2])<=0):
+    if((self.kf.x[6]*dt+self.kf.x[2])<=0):
       self.kf.x[6] *= 0.0
-    self.kf.predict()
+    if(dt != self.dt):
+      self.kf.F[0,4] = self.kf.F[1,5] = self.kf.F[2,6] = dt
+      self.dt = dt
+    if(dt == 1):
+      self.kf.predict()
+    else:
+      self.kf.predict(Q=self.kf.Q * dt)
     self.age += 1
     if(self.time_since_update>0):
       self.hit_streak = 0
@@ -207,10 +210,11 @@ class Sort(object):
     self.trackers = []
     self.frame_count = 0
 
-  def update(self, dets=np.empty((0, 5))):
+  def update(self, dets=np.empty((0, 5)), dt=1):
     """
     Params:
       dets - a numpy array of detections in the format [[x1,y1,x2,y2,score],[x1,y1,x2,y2,score],...]
+      dt - frames elapsed since the previous call (greater than 1 when frames were skipped or dropped)
     Requires: this method must be called once for each frame even with empty detections (use np.empty((0, 5)) for frames without detections).
     Returns the a similar array, where the last column is the object ID.
 
@@ -222,7 +226,7 @@ class Sort(object):
     to_del = []
     ret = []
     for t, trk in enumerate(trks):
-      pos = self.trackers[t].predict()[0]
+      pos = self.trackers[t].predict(dt)[0]
       trk[:] = [pos[0], pos[1], pos[2], pos[3], 0]
       if np.any(np.isnan(pos)):
         to_del.append(t)
@@ -269,6 +273,13 @@ def parse_args():
     return args
 
 if __name__ == '__main__':
+  # display-only dependencies, not needed by the tracker itself
+  import matplotlib
+  matplotlib.use('TkAgg')
+  import matplotlib.pyplot as plt
+  import matplotlib.patches as patches
+  from skimage import io
+
   # all train
   args = parse_args()
   display = args.display
@@ -0,0 +1,190 @@
+import shutil
+import subprocess
+import tempfile
+import cv2
+import numpy as np
+
+# Region of interest as fractions of the frame: (x0, y0, x1, y1).
+# Default matches the original detect_video crop: right half, 40%-80% of the height.
+DEFAULT_ROI = (0.5, 0.4, 1.0, 0.8)
+
+# Strides at or above this use a container seek instead of grabbing every frame
+SEEK_STRIDE = 30
+
+# Longest side of the decoded ROI for the ffmpeg path (YOLO's default input size)
+DEFAULT_MAX_SIZE = 640
+
+
+def roi_to_pixels(roi, width, height):
+    """
+    Convert a fractional ROI into an even-aligned pixel box (x0, y0, x1, y1).
+    """
+    fx0, fy0, fx1, fy1 = roi
+    x0 = int(width * fx0) // 2 * 2
+    y0 = int(height * fy0) // 2 * 2
+    x1 = int(width * fx1) // 2 * 2
+    y1 = int(height * fy1) // 2 * 2
+    return x0, y0, x1, y1
+
+
+def probe_video(video_path):
+    """
+    Read size, fps and frame count from the container headers.
+    Returns:
+        tuple: (width, height, fps, frame_count)
+    """
+    cap = cv2.VideoCapture(video_path)
+    width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+    height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    fps = cap.get(cv2.CAP_PROP_FPS) or 25.0
+    frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    cap.release()
+    return width, height, fps, frame_count
+
+
+class OpenCVFrameSource:
+    """
+    Full-frame decoding through cv2.VideoCapture.
+
+    Images are in source coordinates (origin (0, 0), scale 1.0); the ROI is taken as a slice
+    view of the frame. Skipped frames are only grabbed (no retrieve / colour conversion),
+    and large strides seek in the container instead.
+    """
+
+    def __init__(self, video_path, roi=DEFAULT_ROI, frame_stride=1, start_frame=0):
+        self.cap = cv2.VideoCapture(video_path)
+        self.width = int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        self.height = int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        self.fps = self.cap.get(cv2.CAP_PROP_FPS) or 25.0
+        self.frame_stride = max(1, int(frame_stride))
+        self.roi_source = roi_to_pixels(roi, self.width, self.height)
+        self.roi_box = self.roi_source
+        self.origin = (0, 0)
+        self.scale = 1.0
+        self.frame_id = start_frame
+        self._started = False
+        if start_frame:
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
+
+    def read(self):
+        """
+        Returns:
+            tuple: (frame_id, image), or None at the end of the stream.
+        """
+        if self._started and self.frame_stride > 1:
+            skip = self.frame_stride - 1
+            if self.frame_stride >= SEEK_STRIDE:
+                self.cap.set(cv2.CAP_PROP_POS_FRAMES, self.frame_id + skip)
+            else:
+                for _ in range(skip):
+                    if not self.cap.grab():
+                        return None
+            self.frame_id += skip
+        self._started = True
+        ret, frame = self.cap.read()
+        if not ret:
+            return None
+        self.frame_id += 1
+        return self.frame_id, frame
+
+    def release(self):
+        self.cap.release()
+
+
+class FFmpegFrameSource:
+    """
+    ROI-only decoding through an ffmpeg pipe.
+
+    ffmpeg selects every frame_stride-th frame, crops to the ROI and downscales it so its longest
+    side is at most max_size before converting to BGR, and frames are read into one preallocated
+    NumPy buffer. The returned image is that buffer: it is overwritten by the next read(), so copy
+    it if it must outlive the loop iteration. Image coordinates map to source coordinates as
+    source = image / scale + origin.
+    """
+
+    def __init__(self, video_path, roi=DEFAULT_ROI, frame_stride=1, start_frame=0,
+                 max_size=DEFAULT_MAX_SIZE, ffmpeg_bin="ffmpeg"):
+        if shutil.which(ffmpeg_bin) is None:
+            raise RuntimeError(f"{ffmpeg_bin} not found; use decoder='opencv' instead")
+        self.width, self.height, self.fps, _ = probe_video(video_path)
+        if self.width <= 0 or self.height <= 0:
+            raise RuntimeError(f"Cannot read video size of {video_path} (missing file or unsupported input)")
+        self.video_path = video_path
+        self.frame_stride = max(1, int(frame_stride))
+        self.roi_source = roi_to_pixels(roi, self.width, self.height)
+        x0, y0, x1, y1 = self.roi_source
+        roi_w, roi_h = x1 - x0, y1 - y0
+
+        self.scale = min(1.0, max_size / max(roi_w, roi_h)) if max_size else 1.0
+        out_w = max(2, int(round(roi_w * self.scale)) // 2 * 2)
+        out_h = max(2, int(round(roi_h * self.scale)) // 2 * 2)
+        self.origin = (x0, y0)
+        self.roi_box = (0, 0, out_w, out_h)
+        self.frame_id = start_frame
+        self._started = False
+
+        filters = []
+        if self.frame_stride > 1:
+            filters.append(f"select=not(mod(n\\,{self.frame_stride}))")
+        filters.append(f"crop={roi_w}:{roi_h}:{x0}:{y0}")
+        if self.scale < 1.0:
+            filters.append(f"scale={out_w}:{out_h}:flags=area")
+        cmd = [ffmpeg_bin, "-loglevel", "error", "-nostdin"]
+        if start_frame:
+            cmd += ["-ss", f"{start_frame / self.fps:.3f}"]
+        cmd += ["-i", video_path, "-an", "-sn", "-vf", ",".join(filters),
+                "-vsync", "0", "-f", "rawvideo", "-pix_fmt", "bgr24", "-"]
+
+        self.buffer = np.empty((out_h, out_w, 3), dtype=np.uint8)
+        self._view = memoryview(self.buffer).cast("B")
+        # stderr goes to a file, not a pipe, so a chatty ffmpeg can never block on it
+        self._stderr = tempfile.TemporaryFile()
+        self.proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=self._stderr, bufsize=self.buffer.nbytes)
+
+    def read(self):
+        """
+        Returns:
+            tuple: (frame_id, image), or None at the end of the stream.
+        Raises:
+            RuntimeError: ffmpeg exited with an error instead of reaching the end of the video.
+        """
+        filled = 0
+        while filled < len(self._view):
+            n = self.proc.stdout.readinto(self._view[filled:])
+            if not n:
+                self._check_exit()
+                return None
+            filled += n
+        self.frame_id += self.frame_stride if self._started else 1
+        self._started = True
+        return self.frame_id, self.buffer
+
+    def _check_exit(self):
+        returncode = self.proc.wait()
+        if returncode != 0:
+            self._stderr.seek(0)
+            message = self._stderr.read().decode(errors="replace").strip().splitlines()
+            raise RuntimeError(f"ffmpeg failed decoding {self.video_path} (exit code {returncode})"
+                               + (f": {message[-1]}" if message else ""))
+
+    def release(self):
+        if self.proc.poll() is None:
+            self.proc.kill()
+        self.proc.stdout.close()
+        self.proc.wait()
+        self._stderr.close()
+
+
+def open_frame_source(video_path, decoder="opencv", roi=DEFAULT_ROI, frame_stride=1, start_frame=0,
+                      max_size=DEFAULT_MAX_SIZE):
+    """
+    Create a frame source for detect_video.
+    Args:
+        decoder: "opencv" for full-frame decoding, "ffmpeg" for ROI-cropped, downscaled decoding.
+    """
+    if decoder == "ffmpeg":
+        return FFmpegFrameSource(video_path, roi=roi, frame_stride=frame_stride,
+                                 start_frame=start_frame, max_size=max_size)
+    if decoder == "opencv":
+        return OpenCVFrameSource(video_path, roi=roi, frame_stride=frame_stride, start_frame=start_frame)
+    raise ValueError(f"Unknown decoder: {decoder}")
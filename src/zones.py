@@ -0,0 +1,177 @@
+import json
+import cv2
+import numpy as np
+
+# Lane config format (JSON list, full-frame pixel coordinates):
+# [
+#   {"id": 1, "polygon": [[x, y], ...], "line": [[x1, y1], [x2, y2]], "direction": "positive"},
+#   {"id": 2, "polygon": [[x, y], ...]}
+# ]
+# A lane with a "line" counts tracks whose centre crosses it (inside "polygon" if one is given);
+# a lane with only a "polygon" counts tracks when they first enter it.
+# "direction" is "positive", "negative" or "any". Positive crossings move towards the side where the
+# signed area of (first point, second point, centre) is positive: for a line drawn left-to-right this
+# is downward movement in image coordinates.
+
+DIRECTIONS = {"any": 0, "positive": 1, "negative": -1}
+
+
+def load_lane_config(path):
+    """
+    Load lane definitions from a JSON file.
+    """
+    with open(path) as f:
+        return json.load(f)
+
+
+def points_in_polygons(points, edge_start, edge_end):
+    """
+    Vectorized crossing-number test of every point against every polygon.
+    Args:
+        points: (N, 2) array of x, y.
+        edge_start, edge_end: (L, E, 2) arrays of polygon edges, padded with zero-length edges.
+    Returns:
+        np.ndarray: (N, L) boolean matrix, True where point n lies inside polygon l.
+    """
+    if len(points) == 0 or len(edge_start) == 0:
+        return np.zeros((len(points), len(edge_start)), dtype=bool)
+    px = points[:, 0][:, None, None]
+    py = points[:, 1][:, None, None]
+    x1, y1 = edge_start[None, :, :, 0], edge_start[None, :, :, 1]
+    x2, y2 = edge_end[None, :, :, 0], edge_end[None, :, :, 1]
+    straddles = (y1 > py) != (y2 > py)
+    dy = np.where(straddles, y2 - y1, 1.0)
+    x_cross = x1 + (py - y1) * (x2 - x1) / dy
+    hits = straddles & (px < x_cross)
+    return (hits.sum(axis=2) % 2) == 1
+
+
+def _side(a, b, p):
+    """
+    Signed side of points p relative to lines a->b (broadcasting).
+    """
+    return (b[..., 0] - a[..., 0]) * (p[..., 1] - a[..., 1]) - (b[..., 1] - a[..., 1]) * (p[..., 0] - a[..., 0])
+
+
+class LaneCounter:
+    """
+    Counts tracks per lane for any number of polygon zones and directional counting lines,
+    evaluating all tracks against all lanes with one vectorized test per frame.
+    """
+
+    def __init__(self, lanes):
+        if isinstance(lanes, str):
+            lanes = load_lane_config(lanes)
+        self.lanes = lanes
+        self.lane_ids = [lane["id"] for lane in lanes]
+        n = len(lanes)
+
+        # Polygons padded to the same edge count (zero-length edges never toggle the test)
+        max_edges = max([len(lane.get("polygon", [])) for lane in lanes] + [1])
+        self.edge_start = np.zeros((n, max_edges, 2), dtype=np.float32)
+        self.edge_end = np.zeros((n, max_edges, 2), dtype=np.float32)
+        self.has_polygon = np.zeros(n, dtype=bool)
+        for i, lane in enumerate(lanes):
+            poly = np.asarray(lane.get("polygon", []), dtype=np.float32)
+            if len(poly) >= 3:
+                self.has_polygon[i] = True
+                self.edge_start[i, :len(poly)] = poly
+                self.edge_end[i, :len(poly)] = np.roll(poly, -1, axis=0)
+
+        self.line_a = np.zeros((n, 2), dtype=np.float32)
+        self.line_b = np.zeros((n, 2), dtype=np.float32)
+        self.has_line = np.zeros(n, dtype=bool)
+        self.direction = np.zeros(n, dtype=np.int8)
+        for i, lane in enumerate(lanes):
+            if lane.get("line"):
+                self.has_line[i] = True
+                self.line_a[i], self.line_b[i] = lane["line"]
+                self.direction[i] = DIRECTIONS[lane.get("direction", "any")]
+
+        self.lane_counts = {lane_id: {} for lane_id in self.lane_ids}
+        self.counted = set()           # (track_id, lane_index) already counted
+        self.last_positions = {}       # track_id -> (cx, cy)
+        self.last_inside = {}          # track_id -> (L,) bool membership
+
+    def zone_membership(self, centers):
+        """
+        Returns:
+            np.ndarray: (N, L) boolean matrix of which lane polygons contain each centre.
+        """
+        return points_in_polygons(centers, self.edge_start, self.edge_end) & self.has_polygon
+
+    def update(self, track_ids, centers, labels):
+        """
+        Test this frame's tracks against every lane and record new counts.
+        Args:
+            track_ids: Sequence of N track ids.
+            centers: (N, 2) array of track centres in full-frame coordinates.
+            labels: Sequence of N class labels (None when the class is unknown).
+        Returns:
+            list: (track_id, lane_id, label) for each count made this frame.
+        """
+        events = []
+        track_ids = [int(t) for t in track_ids]
+        centers = np.asarray(centers, dtype=np.float32).reshape(-1, 2)
+        inside = self.zone_membership(centers)
+
+        prev = np.array([self.last_positions.get(t, c) for t, c in zip(track_ids, centers)],
+                        dtype=np.float32).reshape(-1, 2)
+        was_inside = np.array([self.last_inside.get(t, np.zeros(len(self.lanes), dtype=bool))
+                               for t in track_ids], dtype=bool).reshape(len(track_ids), len(self.lanes))
+
+        # Directional crossing: sign change of the centre's side, with the movement segment
+        # straddling the line segment itself (N, L)
+        a, b = self.line_a[None], self.line_b[None]
+        side_prev = _side(a, b, prev[:, None])
+        side_cur = _side(a, b, centers[:, None])
+        move_a, move_b = prev[:, None], centers[:, None]
+        ends_straddle = (_side(move_a, move_b, a) * _side(move_a, move_b, b)) <= 0
+        crossed = ((side_prev < 0) != (side_cur < 0)) & ends_straddle
+        direction_ok = (self.direction == 0) | (np.sign(side_cur - side_prev) == self.direction)
+        crossed &= direction_ok & self.has_line
+        crossed &= inside | ~self.has_polygon
+
+        # Zone-only lanes count on entry
+        entered = inside & ~was_inside & ~self.has_line
+
+        for n, l in zip(*np.nonzero(crossed | entered)):
+            key = (track_ids[n], l)
+            if key in self.counted:
+                continue
+            self.counted.add(key)
+            label = labels[n]
+            if label is None:
+                continue
+            lane_id = self.lane_ids[l]
+            self.lane_counts[lane_id][label] = self.lane_counts[lane_id].get(label, 0) + 1
+            events.append((track_ids[n], lane_id, label))
+
+        # Keep state only for tracks present this frame
+        self.last_positions = {t: tuple(c) for t, c in zip(track_ids, centers)}
+        self.last_inside = {t: inside[n] for n, t in enumerate(track_ids)}
+        return events
+
+    def draw(self, frame, origin=(0, 0), scale=1.0):
+        """
+        Draw lane polygons and counting lines onto an annotated frame.
+        Args:
+            origin, scale: Mapping from lane (source) coordinates to frame pixels,
+                image = (source - origin) * scale.
+        """
+        origin = np.asarray(origin, dtype=np.float32)
+
+        def to_image(points):
+            return ((np.asarray(points, dtype=np.float32) - origin) * scale).astype(np.int32)
+
+        for i, lane in enumerate(self.lanes):
+            if self.has_polygon[i]:
+                cv2.polylines(frame, [to_image(lane["polygon"]).reshape(-1, 1, 2)], True, (255, 255, 0), 2)
+            if self.has_line[i]:
+                (x1, y1), (x2, y2) = to_image(lane["line"])
+                cv2.line(frame, (int(x1), int(y1)), (int(x2), int(y2)), (0, 0, 255), 2)
+            anchor = to_image(lane["line"][0] if self.has_line[i] else lane["polygon"][0])
+            counts = self.lane_counts[lane["id"]]
+            cv2.putText(frame, f"Lane {lane['id']}: {sum(counts.values())}",
+                        (int(anchor[0]), int(anchor[1]) - 8),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 0), 2)